@@ -0,0 +1,118 @@
+"""
+Therapy adherence analytics for SleepMitra
+Vectorized completion rates, streaks, scheduling delays and module drop-off
+funnels over a table of therapy sessions, for one patient or whole cohorts.
+Reports are cached per data version so repeated renders are free.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Reports kept in memory (one per data version)
+MAX_CACHED_REPORTS = 128
+
+
+def sessions_frame(therapy_sessions: List[Dict], patient_id: str, cohort: str = "default") -> pd.DataFrame:
+    """Build the sessions table from session-state therapy_sessions records"""
+    df = pd.DataFrame({
+        'patient_id': patient_id,
+        'cohort': cohort,
+        'session_id': [s['id'] for s in therapy_sessions],
+        'module_id': [s['module_id'] for s in therapy_sessions],
+        'status': [s['status'] for s in therapy_sessions],
+        'scheduled_at': [s['datetime'] for s in therapy_sessions],
+        'completed_at': [s.get('completed_at') for s in therapy_sessions]
+    })
+    df['scheduled_at'] = pd.to_datetime(df['scheduled_at'])
+    df['completed_at'] = pd.to_datetime(df['completed_at'])
+    return df
+
+
+def completion_rates(df: pd.DataFrame, by: str = 'patient_id') -> pd.DataFrame:
+    """Per-group session counts, completion rate and mean delay (minutes) between scheduled and completed"""
+    completed = df['status'].eq('completed')
+    missed = df['status'].eq('missed')
+    delay = (df['completed_at'] - df['scheduled_at']).dt.total_seconds() / 60
+
+    frame = pd.DataFrame({
+        by: df[by],
+        'scheduled': 1,
+        'completed': completed.astype(int),
+        'missed': missed.astype(int),
+        'delay_minutes': delay.where(completed)
+    })
+    grouped = frame.groupby(by, sort=True)
+    result = grouped[['scheduled', 'completed', 'missed']].sum()
+    resolved = result['completed'] + result['missed']
+    result['completion_rate'] = np.where(resolved > 0, result['completed'] / resolved.where(resolved > 0, 1), np.nan)
+    result['avg_delay_minutes'] = grouped['delay_minutes'].mean()
+    return result
+
+
+def streaks(df: pd.DataFrame) -> pd.DataFrame:
+    """Current and longest run of consecutively completed sessions per patient (pending sessions are skipped)"""
+    resolved = df[df['status'].isin(['completed', 'missed'])].sort_values(['patient_id', 'scheduled_at'])
+    if resolved.empty:
+        return pd.DataFrame(columns=['current_streak', 'longest_streak'])
+
+    completed = resolved['status'].eq('completed').astype(int)
+    # Every miss starts a new run; runs are numbered per patient
+    run_id = resolved['status'].eq('missed').astype(int).groupby(resolved['patient_id']).cumsum()
+    run_lengths = completed.groupby([resolved['patient_id'], run_id]).sum()
+
+    longest = run_lengths.groupby(level=0).max()
+    current = run_lengths.groupby(level=0).last()
+    return pd.DataFrame({'current_streak': current, 'longest_streak': longest}).astype(int)
+
+
+def module_funnel(df: pd.DataFrame, module_order: Sequence[str]) -> pd.DataFrame:
+    """Patients completing each module in plan order, with drop-off relative to the previous step"""
+    completed = df[df['status'].eq('completed')]
+    patients = completed.groupby('module_id')['patient_id'].nunique()
+    counts = patients.reindex(list(module_order), fill_value=0)
+
+    previous = counts.shift(1)
+    previous.iloc[:1] = counts.iloc[:1]
+    dropoff = np.where(previous > 0, 1 - counts / previous.where(previous > 0, 1), 0.0)
+    return pd.DataFrame({'patients': counts.astype(int), 'dropoff_rate': dropoff}, index=counts.index)
+
+
+def adherence_report(df: pd.DataFrame, module_order: Sequence[str]) -> Dict[str, pd.DataFrame]:
+    """All adherence views for a sessions table"""
+    patients = completion_rates(df, 'patient_id').join(streaks(df), how='left')
+    # Patients without any completed/missed session have no streak yet
+    patients[['current_streak', 'longest_streak']] = patients[['current_streak', 'longest_streak']].fillna(0).astype(int)
+    return {
+        'patients': patients,
+        'cohorts': completion_rates(df, 'cohort'),
+        'funnel': module_funnel(df, module_order)
+    }
+
+
+_reports: "OrderedDict[Hashable, Dict[str, pd.DataFrame]]" = OrderedDict()
+_reports_lock = threading.Lock()
+
+
+def get_adherence_report(data_version: Hashable, load_sessions: Callable[[], pd.DataFrame],
+                         module_order: Sequence[str]) -> Dict[str, pd.DataFrame]:
+    """Cached adherence_report; the sessions table is only loaded on a miss.
+
+    Callers must change data_version whenever the underlying sessions change.
+    """
+    key = (data_version, tuple(module_order))
+    with _reports_lock:
+        report: Optional[Dict[str, pd.DataFrame]] = _reports.get(key)
+        if report is not None:
+            _reports.move_to_end(key)
+            return report
+
+    report = adherence_report(load_sessions(), module_order)
+    with _reports_lock:
+        _reports[key] = report
+        if len(_reports) > MAX_CACHED_REPORTS:
+            _reports.popitem(last=False)
+    return report
@@ -3,94 +3,189 @@ AI Voice Assistant for SleepMitra
 This module provides voice-to-text and AI-powered responses in Hindi
 """
 
+import threading
+from collections import deque
 import streamlit as st
-import openai
 import speech_recognition as sr
 import pyttsx3
 from datetime import datetime
-import os
+
+from answer_router import LLMUnavailable, get_answer_router
+from circuit_breaker import CircuitOpenError
+from llm_backends import backend_setup_hint, backend_unavailable_reason, get_llm_backend
+from prompt_builder import get_prompt_builder
+
+VOICE_SYSTEM_PROMPT = "आप SleepMitra के AI असिस्टेंट हैं। नींद चिकित्सा विशेषज्ञ के रूप में हिंदी में जवाब दें।"
+VOICE_INSTRUCTIONS = """कृपया:
+1. हिंदी में जवाब दें
+2. नींद चिकित्सा के विशेषज्ञ के रूप में सलाह दें
+3. व्यावहारिक सुझाव दें
+4. यदि गंभीर समस्या है तो डॉक्टर से मिलने की सलाह दें
+5. 2-3 वाक्यों में संक्षिप्त जवाब दें"""
+
+# Voice engines are heavy (audio device, TTS driver, voice scan), so they are created on first use and
+# shared by every session; one session at a time may use the microphone or the speaker.
+_tts_engine = None
+_tts_lock = threading.Lock()
+_microphone = None
+_microphone_lock = threading.Lock()
+_engines_lock = threading.Lock()
+
+def find_hindi_voice(engine):
+    """Id of the first Hindi/Indian system voice, or None"""
+    for voice in engine.getProperty('voices'):
+        if 'hindi' in voice.name.lower() or 'indian' in voice.name.lower():
+            return voice.id
+    return None
+
+def get_tts_engine():
+    """Process-wide text-to-speech engine, set up for Hindi once (use under _tts_lock)"""
+    global _tts_engine
+    with _engines_lock:
+        if _tts_engine is None:
+            engine = pyttsx3.init()
+            # The voice catalogue is scanned once per process
+            voice_id = find_hindi_voice(engine)
+            if voice_id:
+                engine.setProperty('voice', voice_id)
+            
+            # Set speech rate and volume
+            engine.setProperty('rate', 150)  # Speed of speech
+            engine.setProperty('volume', 0.8)  # Volume level
+            _tts_engine = engine
+        return _tts_engine
+
+def get_microphone():
+    """Process-wide microphone (use under _microphone_lock)"""
+    global _microphone
+    with _engines_lock:
+        if _microphone is None:
+            _microphone = sr.Microphone()
+        return _microphone
+
+# Recent recognition outcomes kept per microphone, and the failure rate among them that triggers recalibration
+CALIBRATION_WINDOW = 10
+CALIBRATION_MIN_ATTEMPTS = 4
+RECALIBRATE_FAILURE_RATE = 0.5
+
+class NoiseCalibration:
+    """Ambient-noise energy threshold of one microphone: measured once, then adapted while listening"""
+    
+    def __init__(self):
+        self.energy_threshold = None
+        self.calibrations = 0
+        self.outcomes = deque(maxlen=CALIBRATION_WINDOW)
+        self._lock = threading.Lock()
+    
+    def needs_calibration(self):
+        with self._lock:
+            if self.energy_threshold is None:
+                return True
+            if len(self.outcomes) < CALIBRATION_MIN_ATTEMPTS:
+                return False
+            return self.outcomes.count(False) / len(self.outcomes) > RECALIBRATE_FAILURE_RATE
+    
+    def calibrated(self, energy_threshold):
+        with self._lock:
+            self.energy_threshold = energy_threshold
+            self.calibrations += 1
+            self.outcomes.clear()
+    
+    def record(self, recognized, energy_threshold):
+        """Outcome of one capture; the threshold the recognizer adapted from its silence is kept"""
+        with self._lock:
+            self.outcomes.append(recognized)
+            if self.energy_threshold is not None:
+                self.energy_threshold = energy_threshold
+
+_calibrations = {}
+
+def get_noise_calibration(microphone):
+    """Calibration shared by every session using this microphone"""
+    key = getattr(microphone, 'device_index', None)
+    with _engines_lock:
+        if key not in _calibrations:
+            _calibrations[key] = NoiseCalibration()
+        return _calibrations[key]
 
 class SleepMitraVoiceAssistant:
     def __init__(self):
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
-        self.tts_engine = pyttsx3.init()
-        self.setup_tts()
-    
-    def setup_tts(self):
-        """Setup text-to-speech engine for Hindi"""
-        voices = self.tts_engine.getProperty('voices')
-        # Try to find Hindi voice
-        for voice in voices:
-            if 'hindi' in voice.name.lower() or 'indian' in voice.name.lower():
-                self.tts_engine.setProperty('voice', voice.id)
-                break
-        
-        # Set speech rate and volume
-        self.tts_engine.setProperty('rate', 150)  # Speed of speech
-        self.tts_engine.setProperty('volume', 0.8)  # Volume level
+        # Nothing is opened until voice is actually used
+        self._recognizer = None
+    
+    @property
+    def recognizer(self):
+        if self._recognizer is None:
+            self._recognizer = sr.Recognizer()
+            # Keep adapting the energy threshold from the silence before each utterance
+            self._recognizer.dynamic_energy_threshold = True
+        return self._recognizer
+    
+    @property
+    def microphone(self):
+        return get_microphone()
+    
+    @property
+    def tts_engine(self):
+        return get_tts_engine()
     
     def listen_to_voice(self):
         """Listen to user's voice and convert to text"""
+        recognizer = self.recognizer
         try:
-            with self.microphone as source:
+            calibration = get_noise_calibration(self.microphone)
+            with _microphone_lock, self.microphone as source:
                 st.info("🎤 सुन रहा हूं... बोलिए")
-                self.recognizer.adjust_for_ambient_noise(source)
-                audio = self.recognizer.listen(source, timeout=5)
+                # Measuring ambient noise costs about a second, so it is done once per microphone
+                # and repeated only when recognition keeps failing
+                if calibration.needs_calibration():
+                    recognizer.adjust_for_ambient_noise(source)
+                    calibration.calibrated(recognizer.energy_threshold)
+                else:
+                    recognizer.energy_threshold = calibration.energy_threshold
+                audio = recognizer.listen(source, timeout=5)
             
             # Convert speech to text
-            text = self.recognizer.recognize_google(audio, language='hi-IN')
+            text = recognizer.recognize_google(audio, language='hi-IN')
+            calibration.record(True, recognizer.energy_threshold)
             return text
         except sr.WaitTimeoutError:
+            calibration.record(False, recognizer.energy_threshold)
             return "समय समाप्त - कोई आवाज नहीं सुनी गई"
         except sr.UnknownValueError:
+            calibration.record(False, recognizer.energy_threshold)
             return "आवाज समझ नहीं आई - कृपया दोबारा बोलें"
         except Exception as e:
             return f"त्रुटि: {str(e)}"
     
     def get_ai_response(self, user_question):
-        """Get AI response using OpenAI API"""
+        """Get AI response from the configured LLM backend"""
         try:
-            # Set up OpenAI API
-            openai.api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-            
-            if not openai.api_key:
-                return "OpenAI API key नहीं मिली। कृपया API key सेट करें।"
-            
-            # Create prompt for sleep-related questions in Hindi
-            prompt = f"""
-            आप SleepMitra के AI असिस्टेंट हैं। नींद चिकित्सा विशेषज्ञ के रूप में हिंदी में जवाब दें।
-            
-            उपयोगकर्ता का सवाल: {user_question}
+            # Shared process-wide backend (OpenAI, local model or fake, by configuration)
+            backend = get_llm_backend()
             
-            कृपया:
-            1. हिंदी में जवाब दें
-            2. नींद चिकित्सा के विशेषज्ञ के रूप में सलाह दें
-            3. व्यावहारिक सुझाव दें
-            4. यदि गंभीर समस्या है तो डॉक्टर से मिलने की सलाह दें
-            5. 2-3 वाक्यों में संक्षिप्त जवाब दें
-            """
+            if not backend:
+                # Same cause as the chat shows: a failed start, or what the selected backend still needs
+                return f"AI असिस्टेंट उपलब्ध नहीं है। {backend_unavailable_reason() or backend_setup_hint()}"
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "आप SleepMitra के AI असिस्टेंट हैं। नींद चिकित्सा विशेषज्ञ के रूप में हिंदी में जवाब दें।"},
-                    {"role": "user", "content": user_question}
-                ],
-                max_tokens=200,
-                temperature=0.7
-            )
+            # Persona and instructions are a fixed prefix; only the question changes per request
+            prompt = get_prompt_builder(VOICE_SYSTEM_PROMPT, VOICE_INSTRUCTIONS).build(user_question)
             
-            return response.choices[0].message.content
+            return backend.complete(prompt.messages, max_tokens=200, temperature=0.7)
             
+        except CircuitOpenError:
+            # The AI is failing or too slow right now; the router answers from the knowledge base
+            raise LLMUnavailable("circuit_open")
         except Exception as e:
             return f"AI से जवाब नहीं मिल सका: {str(e)}"
     
     def speak_response(self, text):
         """Convert text to speech"""
         try:
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
+            engine = self.tts_engine
+            with _tts_lock:
+                engine.say(text)
+                engine.runAndWait()
         except Exception as e:
             st.error(f"आवाज में जवाब नहीं सुना सका: {str(e)}")
     
@@ -102,8 +197,8 @@ class SleepMitraVoiceAssistant:
         if "त्रुटि" in user_text or "समय समाप्त" in user_text:
             return user_text, ""
         
-        # Step 2: Get AI response
-        ai_response = self.get_ai_response(user_text)
+        # Step 2: Get AI response (knowledge base first, AI only when it is not confident)
+        ai_response = get_answer_router().answer(user_text, self.get_ai_response).text
         
         # Step 3: Speak response
         self.speak_response(ai_response)
@@ -0,0 +1,140 @@
+"""
+Answer routing for the SleepMitra AI assistant
+Questions are answered from the local knowledge base (exact, keyword and fuzzy
+matches) when it is confident enough, and escalated to the LLM only when it is
+not. When the LLM declines a request (LLMUnavailable), the best local answer
+is served instead. Every routing decision is logged with its latency, and
+recent latencies are kept per route so the confidence threshold can be tuned.
+"""
+
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional
+
+from knowledge_base import get_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+# Keyword and fuzzy (retrieval) matches below this confidence go to the LLM; only exact matches are always local
+DEFAULT_CONFIDENCE_THRESHOLD = 0.3
+
+# Latency samples kept per route
+LATENCY_WINDOW = 500
+
+FALLBACK_NOTICE = "ℹ️ AI असिस्टेंट अभी व्यस्त है, इसलिए यह जवाब हमारे ज्ञानकोष से है।\n\n"
+
+ROUTES = ('kb', 'llm', 'fallback')
+
+
+class LLMUnavailable(Exception):
+    """Raised by an LLM callable that declines to run (e.g. rate limited); the router answers locally"""
+
+
+@dataclass
+class RoutedAnswer:
+    text: str
+    source: str  # 'kb', 'llm' or 'fallback'
+    method: str  # knowledge base match method ('exact', 'keyword', 'retrieval' or 'none')
+    confidence: float
+    latency_ms: float
+
+
+class AnswerRouter:
+    """Local knowledge base first, LLM only on low confidence"""
+
+    def __init__(self, confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD):
+        self.confidence_threshold = confidence_threshold
+        self.counts: Dict[str, int] = {route: 0 for route in ROUTES}
+        self._latencies: Dict[str, deque] = {route: deque(maxlen=LATENCY_WINDOW) for route in ROUTES}
+        self._lock = threading.Lock()
+
+    def decide(self, question: str) -> RoutedAnswer:
+        """Route a question: a complete 'kb' answer, or an empty 'llm' answer to be filled by the caller"""
+        started = time.perf_counter()
+        entry, confidence, method = get_knowledge_base().lookup(question)
+        # Only exact matches are trusted regardless of confidence
+        local = entry is not None and (method == 'exact' or confidence >= self.confidence_threshold)
+        return RoutedAnswer(entry['answer'] if local else "", 'kb' if local else 'llm', method, confidence,
+                            (time.perf_counter() - started) * 1000)
+
+    def fallback_text(self, question: str) -> str:
+        """Best local answer regardless of confidence, or the knowledge base's default reply"""
+        knowledge_base = get_knowledge_base()
+        entry, _, _ = knowledge_base.lookup(question)
+        if entry is None:
+            results = knowledge_base.search(question, k=1)
+            entry = results[0][0] if results else knowledge_base.fallback
+        return FALLBACK_NOTICE + entry['answer']
+
+    def _record(self, question: str, answer: RoutedAnswer, reason: str = ""):
+        with self._lock:
+            self.counts[answer.source] += 1
+            self._latencies[answer.source].append(answer.latency_ms)
+        logger.info("route=%s method=%s confidence=%.2f latency_ms=%.1f question_chars=%d%s",
+                    answer.source, answer.method, answer.confidence, answer.latency_ms, len(question),
+                    f" reason={reason}" if reason else "")
+
+    def answer(self, question: str, ask_llm: Callable[[str], str]) -> RoutedAnswer:
+        started = time.perf_counter()
+        routed = self.decide(question)
+        reason = ""
+        if routed.source == 'llm':
+            try:
+                routed.text = ask_llm(question)
+            except LLMUnavailable as e:
+                routed.source, routed.text, reason = 'fallback', self.fallback_text(question), str(e)
+            routed.latency_ms = (time.perf_counter() - started) * 1000
+        self._record(question, routed, reason)
+        return routed
+
+    def stream(self, question: str, stream_llm: Callable[[str], Iterator[str]]) -> Iterator[str]:
+        """Streaming variant of answer(); local answers arrive in one piece"""
+        started = time.perf_counter()
+        routed = self.decide(question)
+        if routed.source == 'kb':
+            self._record(question, routed)
+            yield routed.text
+            return
+
+        parts = []
+        reason = ""
+        try:
+            for delta in stream_llm(question):
+                parts.append(delta)
+                yield delta
+        except LLMUnavailable as e:
+            # Only raised before the first chunk, so nothing has been shown yet
+            routed.source, reason = 'fallback', str(e)
+            parts = [self.fallback_text(question)]
+            yield parts[0]
+        routed.text = "".join(parts)
+        routed.latency_ms = (time.perf_counter() - started) * 1000
+        self._record(question, routed, reason)
+
+    def latency_percentiles(self, source: str) -> Dict[str, float]:
+        """p50/p95 of recent latencies (ms) for one route"""
+        with self._lock:
+            samples = list(self._latencies[source])
+        if len(samples) < 2:
+            value = samples[0] if samples else 0.0
+            return {'p50': value, 'p95': value}
+        cuts = statistics.quantiles(samples, n=20)
+        return {'p50': statistics.median(samples), 'p95': cuts[18]}
+
+
+_router: Optional[AnswerRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_answer_router() -> AnswerRouter:
+    """Process-wide router; the threshold can be tuned with SLEEPMITRA_KB_CONFIDENCE_THRESHOLD"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = AnswerRouter(float(os.getenv("SLEEPMITRA_KB_CONFIDENCE_THRESHOLD", DEFAULT_CONFIDENCE_THRESHOLD)))
+        return _router
@@ -0,0 +1,188 @@
+"""
+AI-path benchmark for SleepMitra
+Drives the app's AI functions (get_ai_response, stream_ai_response, or the
+voice pipeline through process_voice_input) at a given concurrency against the
+local mock OpenAI server, and reports p50/p95/p99 latency and throughput, so
+changes to the AI path can be measured offline.
+
+    python benchmark_ai.py --target complete --requests 200 --concurrency 8 --latency 0.3
+    python benchmark_ai.py --target stream --tokens-per-second 50
+    python benchmark_ai.py --target voice --distinct 20
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+TARGETS = ('complete', 'stream', 'voice')
+
+QUESTIONS = [
+    "मुझे रात को बार-बार प्यास लगती है, क्या इससे नींद पर असर पड़ता है",
+    "नाइट शिफ्ट के बाद दिन में कैसे सोऊँ",
+    "क्या सोने से पहले दूध पीना ठीक है",
+    "बच्चे के रोने से मेरी नींद टूट जाती है, क्या करूँ",
+    "सफ़र में जेट लैग से नींद कैसे ठीक करें",
+]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    if len(samples) == 1:
+        return {'p50': samples[0], 'p95': samples[0], 'p99': samples[0]}
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98]}
+
+
+def question_for(index: int, distinct: int) -> str:
+    # Numbered variants of a few realistic questions; repeats (index >= distinct) hit the cache
+    number = index % distinct
+    return f"{QUESTIONS[number % len(QUESTIONS)]} ({number})?"
+
+
+def configure_environment(args: argparse.Namespace, base_url: Optional[str]):
+    """Point the app at the benchmark backend; must run before the app's singletons are created"""
+    os.environ["SLEEPMITRA_LLM_BACKEND"] = args.backend
+    if base_url:
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+    os.environ.setdefault("SLEEPMITRA_RESPONSE_CACHE_PATH",
+                          os.path.join(tempfile.mkdtemp(prefix="sleepmitra-bench-"), "responses.sqlite3"))
+    os.environ.setdefault("SLEEPMITRA_LLM_MAX_CONCURRENCY", str(args.concurrency))
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+
+def run_one(app, target: str, question: str) -> Tuple[str, float, Optional[float]]:
+    """(outcome, latency ms, time to first chunk ms) for one request"""
+    from answer_router import LLMUnavailable
+
+    started = time.perf_counter()
+    first_chunk_ms = None
+    try:
+        if target == 'complete':
+            text = app.get_ai_response(question)
+        elif target == 'stream':
+            parts = []
+            for delta in app.stream_ai_response(question):
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.perf_counter() - started) * 1000
+                parts.append(delta)
+            text = "".join(parts)
+        else:
+            text = app.process_voice_input(question)
+    except LLMUnavailable as e:
+        return f"unavailable:{e}", (time.perf_counter() - started) * 1000, first_chunk_ms
+    except Exception as e:
+        return f"exception:{type(e).__name__}", (time.perf_counter() - started) * 1000, first_chunk_ms
+    outcome = 'error' if text.startswith("❌") else 'ok'
+    return outcome, (time.perf_counter() - started) * 1000, first_chunk_ms
+
+
+def run_benchmark(app, target: str, requests: int, concurrency: int, distinct: int) -> Dict[str, object]:
+    results: List[Tuple[str, float, Optional[float]]] = []
+    results_lock = threading.Lock()
+
+    def task(index: int):
+        result = run_one(app, target, question_for(index, distinct))
+        with results_lock:
+            results.append(result)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(task, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'elapsed_s': elapsed,
+        'throughput_rps': len(results) / elapsed if elapsed else 0.0,
+        'outcomes': Counter(outcome for outcome, _, _ in results),
+        'latency_ms': percentiles([latency for _, latency, _ in results]),
+        'first_chunk_ms': percentiles([first for _, _, first in results if first is not None]),
+    }
+
+
+def print_report(args: argparse.Namespace, report: Dict[str, object], mock_stats: Optional[Dict[str, int]]):
+    from answer_router import get_answer_router
+    from llm_backends import get_llm_backend
+    from response_cache import get_response_cache
+    from single_flight import get_single_flight
+
+    print(f"target={args.target} backend={args.backend} requests={args.requests} "
+          f"concurrency={args.concurrency} distinct={args.distinct}")
+    print(f"elapsed {report['elapsed_s']:.2f} s, throughput {report['throughput_rps']:.1f} req/s")
+    latency = report['latency_ms']
+    print(f"latency ms    p50 {latency['p50']:8.1f}  p95 {latency['p95']:8.1f}  p99 {latency['p99']:8.1f}")
+    if args.target == 'stream':
+        first = report['first_chunk_ms']
+        print(f"first chunk   p50 {first['p50']:8.1f}  p95 {first['p95']:8.1f}  p99 {first['p99']:8.1f}")
+    print("outcomes", dict(report['outcomes']))
+
+    backend = get_llm_backend()
+    if backend is not None:
+        print(f"backend {backend.backend_id}: {dict(backend.stats)}")
+    print(f"response cache hit rate {get_response_cache().hit_rate():.0%}, "
+          f"single-flight coalesced {get_single_flight().stats['coalesced']}")
+    if args.target == 'voice':
+        print("routes", dict(get_answer_router().counts))
+    if mock_stats is not None:
+        print("mock server", mock_stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SleepMitra AI path against a local mock API")
+    parser.add_argument("--target", choices=TARGETS, default='complete')
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distinct", type=int, default=None, help="distinct questions (default: all unique)")
+    parser.add_argument("--backend", choices=('openai', 'fake'), default='openai',
+                        help="openai talks to the mock server; fake skips HTTP entirely")
+    parser.add_argument("--base-url", default=None, help="use an already running server instead of starting one")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock: seconds before each response")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="mock: streaming rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock: fraction of failed requests")
+    parser.add_argument("--app-rate-limits", action='store_true',
+                        help="keep the app's per-session rate limits (by default they are lifted)")
+    args = parser.parse_args()
+    args.distinct = args.distinct or args.requests
+
+    logging.basicConfig(level=logging.WARNING)
+    server = None
+    base_url = args.base_url
+    if args.backend == 'openai' and base_url is None:
+        from mock_openai_server import MockSettings, start_mock_server
+        server = start_mock_server(MockSettings(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                                                error_rate=args.error_rate, seed=0))
+        base_url = server.base_url
+    if args.backend == 'fake':
+        os.environ.setdefault("SLEEPMITRA_FAKE_LLM_LATENCY", str(args.latency))
+        if args.tokens_per_second:
+            os.environ.setdefault("SLEEPMITRA_FAKE_LLM_TOKEN_DELAY", str(1 / args.tokens_per_second))
+    configure_environment(args, base_url)
+
+    if not args.app_rate_limits:
+        # Every benchmark request comes from one bare-mode "session", which the per-session limit would throttle
+        import rate_limit
+        rate_limit._limiter = rate_limit.AIRateLimiter(
+            session_rate_per_minute=1e9, session_burst=args.requests, user_rate_per_minute=1e9,
+            user_burst=args.requests, max_outstanding=max(args.concurrency, rate_limit.MAX_OUTSTANDING_CALLS))
+
+    # Importing the app runs it once in Streamlit's bare mode, which is enough to call its functions
+    import streamlit_app as app
+
+    try:
+        report = run_benchmark(app, args.target, args.requests, args.concurrency, args.distinct)
+        print_report(args, report, dict(server.settings.stats) if server else None)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+iCalendar feed for SleepMitra
+Renders a user's therapy sessions and appointments as an ICS feed. Each VEVENT
+is cached with a fingerprint of its source fields so only changed events are
+re-serialized, and the whole feed is cached until an event changes.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PRODID = "-//SleepMitra//Therapy Calendar//HI"
+
+# Feeds kept in memory (least recently used feeds are dropped first)
+MAX_FEEDS = 1000
+
+
+def escape_text(value: str) -> str:
+    """Escape a TEXT value as required by RFC 5545"""
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold_line(line: str) -> str:
+    """Fold a content line at 75 octets without splitting UTF-8 characters"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+
+    parts = []
+    current = b''
+    limit = 75
+    for char in line:
+        char_bytes = char.encode('utf-8')
+        if len(current) + len(char_bytes) > limit:
+            parts.append(current.decode('utf-8'))
+            current = b''
+            # Continuation lines start with a space, which counts towards the limit
+            limit = 74
+        current += char_bytes
+    parts.append(current.decode('utf-8'))
+    return '\r\n '.join(parts)
+
+
+def format_datetime(value: datetime) -> str:
+    """Floating local time, matching the naive datetimes stored in session state"""
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def format_utc(value: datetime) -> str:
+    """UTC time with the Z suffix, as RFC 5545 requires for DTSTAMP (naive values are local time)"""
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def parse_duration_minutes(duration: str, default: int = 30) -> int:
+    """Parse durations like '30 मिनट' from the module catalog"""
+    match = re.search(r'\d+', duration or '')
+    return int(match.group()) if match else default
+
+
+class CalendarFeed:
+    """Incrementally rendered ICS feed for one user"""
+
+    def __init__(self, calendar_name: str = "SleepMitra"):
+        self.calendar_name = calendar_name
+        self.version = 0
+        self._events: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._body: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(event: Dict) -> str:
+        fields = (event['uid'], event['start'].isoformat(), event['end'].isoformat(), event['summary'],
+                  event.get('description', ''), event.get('location', ''), event.get('status', ''),
+                  event['stamp'].isoformat())
+        return hashlib.sha1('\x1f'.join(fields).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _render_event(event: Dict) -> str:
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{event['uid']}",
+            f"DTSTAMP:{format_utc(event['stamp'])}",
+            f"DTSTART:{format_datetime(event['start'])}",
+            f"DTEND:{format_datetime(event['end'])}",
+            f"SUMMARY:{escape_text(event['summary'])}"
+        ]
+        if event.get('description'):
+            lines.append(f"DESCRIPTION:{escape_text(event['description'])}")
+        if event.get('location'):
+            lines.append(f"LOCATION:{escape_text(event['location'])}")
+        if event.get('status'):
+            lines.append(f"STATUS:{event['status']}")
+        lines.append("END:VEVENT")
+        return '\r\n'.join(fold_line(line) for line in lines)
+
+    def update(self, events: Iterable[Dict]) -> bool:
+        """Sync the feed with the given events; only new or changed VEVENTs are re-rendered"""
+        with self._lock:
+            changed = False
+            seen = set()
+            for event in events:
+                uid = event['uid']
+                seen.add(uid)
+                fingerprint = self._fingerprint(event)
+                cached = self._events.get(uid)
+                if cached is None or cached[0] != fingerprint:
+                    self._events[uid] = (fingerprint, self._render_event(event))
+                    changed = True
+
+            for uid in [uid for uid in self._events if uid not in seen]:
+                del self._events[uid]
+                changed = True
+
+            if changed:
+                self.version += 1
+                self._body = None
+            return changed
+
+    def render(self) -> str:
+        """Serialized feed, rebuilt only after a change"""
+        with self._lock:
+            if self._body is None:
+                parts = [
+                    "BEGIN:VCALENDAR",
+                    "VERSION:2.0",
+                    f"PRODID:{PRODID}",
+                    "CALSCALE:GREGORIAN",
+                    fold_line(f"X-WR-CALNAME:{escape_text(self.calendar_name)}")
+                ]
+                parts.extend(vevent for _, vevent in self._events.values())
+                parts.append("END:VCALENDAR")
+                self._body = '\r\n'.join(parts) + '\r\n'
+            return self._body
+
+
+def session_events(therapy_sessions: List[Dict], module_lookup) -> List[Dict]:
+    """Calendar events for scheduled therapy sessions"""
+    events = []
+    for session in therapy_sessions:
+        if session['status'] == 'missed':
+            continue
+        module = module_lookup(session['module_id'])
+        if not module:
+            continue
+        start = datetime.fromisoformat(session['datetime'])
+        events.append({
+            'uid': f"{session['id']}-{session['created_at']}@sleepmitra",
+            'stamp': datetime.fromisoformat(session['created_at']),
+            'start': start,
+            'end': start + timedelta(minutes=parse_duration_minutes(module['duration'])),
+            'summary': f"{module['icon']} {module['name']} - SleepMitra",
+            'description': f"{module['description']}\n{module['video_url']}\n{session.get('notes', '')}".strip(),
+            'status': 'CONFIRMED'
+        })
+    return events
+
+
+def booking_events(bookings: List[Dict], duration_minutes: int = 30) -> List[Dict]:
+    """Calendar events for doctor appointments"""
+    events = []
+    for booking in bookings:
+        start = datetime.strptime(f"{booking['date']} {booking['time']}", '%Y-%m-%d %I:%M %p')
+        events.append({
+            'uid': f"booking-{booking['doctor_id']}-{booking['timestamp']}@sleepmitra",
+            'stamp': datetime.fromisoformat(booking['timestamp']),
+            'start': start,
+            'end': start + timedelta(minutes=duration_minutes),
+            'summary': f"{booking['doctor_name']} - अपॉइंटमेंट",
+            'description': f"{booking['type']}\n{booking.get('reason', '')}".strip(),
+            'location': booking.get('clinic', ''),
+            'status': 'CONFIRMED'
+        })
+    return events
+
+
+_feeds: "OrderedDict[str, CalendarFeed]" = OrderedDict()
+_feeds_lock = threading.Lock()
+
+
+def get_calendar_feed(owner: str) -> CalendarFeed:
+    """Process-wide per-user feed cache"""
+    with _feeds_lock:
+        feed = _feeds.get(owner)
+        if feed is None:
+            feed = CalendarFeed()
+            _feeds[owner] = feed
+            if len(_feeds) > MAX_FEEDS:
+                _feeds.popitem(last=False)
+        else:
+            _feeds.move_to_end(owner)
+        return feed
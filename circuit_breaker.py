@@ -0,0 +1,171 @@
+"""
+Circuit breaker for the SleepMitra LLM backend
+Tracks the error rate and p95 latency of upstream calls over a rolling window.
+When either breaches its SLO the circuit opens and calls are refused
+immediately (callers answer locally); after a cool-down a limited number of
+half-open probes decide whether to close it again.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_WINDOW_SECONDS = 60.0
+# Calls needed in the window before the SLOs are evaluated
+DEFAULT_MIN_CALLS = 5
+DEFAULT_MAX_ERROR_RATE = 0.5
+DEFAULT_P95_LATENCY_MS = 10000.0
+DEFAULT_OPEN_SECONDS = 30.0
+DEFAULT_HALF_OPEN_PROBES = 1
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling upstream while the circuit is open"""
+
+
+class ProviderCall:
+    """Times the provider part of one call, excluding local queueing, for the breaker; also carries the
+    token counts the provider reported for it, if any"""
+
+    def __init__(self):
+        self.started: Optional[float] = None
+        self.first_token_ms: Optional[float] = None
+        # (prompt_tokens, completion_tokens) as reported by the provider
+        self.usage: Optional[Tuple[int, int]] = None
+
+    def start(self):
+        """Mark the moment the request is handed to the provider"""
+        if self.started is None:
+            self.started = time.perf_counter()
+
+    def first_token(self):
+        if self.first_token_ms is None and self.started is not None:
+            self.first_token_ms = (time.perf_counter() - self.started) * 1000
+
+    @property
+    def latency_ms(self) -> float:
+        """Time to first token for streams, else time since start"""
+        if self.first_token_ms is not None:
+            return self.first_token_ms
+        return (time.perf_counter() - self.started) * 1000 if self.started is not None else 0.0
+
+
+class CircuitBreaker:
+    """Rolling-window error-rate and latency breaker with half-open probing"""
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS, min_calls: int = DEFAULT_MIN_CALLS,
+                 max_error_rate: float = DEFAULT_MAX_ERROR_RATE, p95_latency_ms: float = DEFAULT_P95_LATENCY_MS,
+                 open_seconds: float = DEFAULT_OPEN_SECONDS, half_open_probes: int = DEFAULT_HALF_OPEN_PROBES):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.max_error_rate = max_error_rate
+        self.p95_latency_ms = p95_latency_ms
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.stats: Dict[str, int] = {'allowed': 0, 'rejected': 0, 'opened': 0, 'closed': 0}
+        self._samples: Deque[Tuple[float, bool, float]] = deque()  # (time, ok, latency ms)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._samples and now - self._samples[0][0] > self.window_seconds:
+            self._samples.popleft()
+
+    def _metrics(self) -> Tuple[float, float]:
+        """(error rate, p95 latency ms) over the current window"""
+        if not self._samples:
+            return 0.0, 0.0
+        errors = sum(1 for _, ok, _ in self._samples if not ok)
+        latencies = sorted(latency for _, _, latency in self._samples)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        return errors / len(self._samples), p95
+
+    def _transition(self, state: str, now: float, reason: str):
+        logger.warning("LLM circuit %s -> %s (%s)", self.state, state, reason)
+        self.state = state
+        if state == OPEN:
+            self._opened_at = now
+            self.stats['opened'] += 1
+        elif state == CLOSED:
+            self._samples.clear()
+            self.stats['closed'] += 1
+        self._probes_in_flight = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; every allowed call must be followed by record() or release()"""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN, now, "cool-down elapsed")
+            if self.state == OPEN or (self.state == HALF_OPEN and self._probes_in_flight >= self.half_open_probes):
+                self.stats['rejected'] += 1
+                return False
+            if self.state == HALF_OPEN:
+                self._probes_in_flight += 1
+            self.stats['allowed'] += 1
+            return True
+
+    def record(self, ok: bool, latency_ms: float):
+        now = time.monotonic()
+        with self._lock:
+            within_slo = ok and latency_ms <= self.p95_latency_ms
+            if self.state == HALF_OPEN:
+                if within_slo:
+                    self._transition(CLOSED, now, f"probe succeeded in {latency_ms:.0f} ms")
+                else:
+                    self._transition(OPEN, now, "probe failed" if not ok else f"probe took {latency_ms:.0f} ms")
+                return
+            if self.state == OPEN:
+                # A call admitted before the circuit opened
+                return
+
+            self._samples.append((now, ok, latency_ms))
+            self._prune(now)
+            if len(self._samples) < self.min_calls:
+                return
+            error_rate, p95 = self._metrics()
+            if error_rate > self.max_error_rate:
+                self._transition(OPEN, now, f"error rate {error_rate:.0%}")
+            elif p95 > self.p95_latency_ms:
+                self._transition(OPEN, now, f"p95 latency {p95:.0f} ms")
+
+    def release(self):
+        """An allowed call ended without a provider verdict (e.g. abandoned by the caller or refused locally)"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            error_rate, p95 = self._metrics()
+            return {'state': self.state, 'calls': len(self._samples), 'error_rate': error_rate, 'p95_latency_ms': p95}
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Process-wide breaker for the LLM backend"""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                max_error_rate=float(os.getenv("SLEEPMITRA_LLM_SLO_ERROR_RATE", DEFAULT_MAX_ERROR_RATE)),
+                p95_latency_ms=float(os.getenv("SLEEPMITRA_LLM_SLO_P95_MS", DEFAULT_P95_LATENCY_MS)),
+                open_seconds=float(os.getenv("SLEEPMITRA_LLM_OPEN_SECONDS", DEFAULT_OPEN_SECONDS))
+            )
+        return _breaker
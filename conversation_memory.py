@@ -0,0 +1,87 @@
+"""
+Conversation memory for the SleepMitra AI assistant
+Keeps the most recent turns within a fixed token budget and folds older turns
+into a compact rolling summary, so session state stays bounded, prompts have a
+predictable size and follow-up questions still have context.
+"""
+
+import math
+import re
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Budgets in estimated tokens
+DEFAULT_RECENT_TOKENS = 800
+DEFAULT_SUMMARY_TOKENS = 250
+
+# Characters of a question / answer kept in its summary line
+SUMMARY_QUESTION_CHARS = 80
+SUMMARY_ANSWER_CHARS = 120
+
+_SENTENCE_END = re.compile(r'(?<=[।.!?])\s')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count: ~4 ASCII characters per token, Devanagari and other scripts ~1 per character"""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars)) if text else 0
+
+
+def _clip(text: str, limit: int) -> str:
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + '…'
+
+
+class ConversationMemory:
+    """Recent turns within a token budget plus a rolling summary of older ones"""
+
+    def __init__(self, recent_tokens: int = DEFAULT_RECENT_TOKENS, summary_tokens: int = DEFAULT_SUMMARY_TOKENS):
+        self.recent_tokens = recent_tokens
+        self.summary_tokens = summary_tokens
+        self.turns: Deque[Dict[str, str]] = deque()
+        self.summary_lines: Deque[str] = deque()
+        self.turn_count = 0
+        self._turn_tokens: Deque[int] = deque()
+
+    @staticmethod
+    def _summarize_turn(turn: Dict[str, str]) -> str:
+        """Extractive one-line summary: the question and the first sentence of the answer"""
+        first_sentence = _SENTENCE_END.split(turn['ai'].strip(), maxsplit=1)[0]
+        return f"सवाल: {_clip(turn['user'], SUMMARY_QUESTION_CHARS)} → जवाब: {_clip(first_sentence, SUMMARY_ANSWER_CHARS)}"
+
+    def add_turn(self, user: str, ai: str, timestamp: Optional[str] = None):
+        turn = {'user': user, 'ai': ai, 'timestamp': timestamp or ''}
+        self.turns.append(turn)
+        self._turn_tokens.append(estimate_tokens(user) + estimate_tokens(ai))
+        self.turn_count += 1
+
+        # Keep at least the latest turn verbatim, even if it alone exceeds the budget
+        while len(self.turns) > 1 and sum(self._turn_tokens) > self.recent_tokens:
+            self._turn_tokens.popleft()
+            self.summary_lines.append(self._summarize_turn(self.turns.popleft()))
+
+        while len(self.summary_lines) > 1 and estimate_tokens(self.summary) > self.summary_tokens:
+            self.summary_lines.popleft()
+
+    @property
+    def summary(self) -> str:
+        return '\n'.join(self.summary_lines)
+
+    def context_messages(self) -> List[Dict[str, str]]:
+        """Chat messages carrying the conversation so far, oldest first"""
+        messages = []
+        if self.summary_lines:
+            messages.append({"role": "system", "content": "पिछली बातचीत का सारांश:\n" + self.summary})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn['user']})
+            messages.append({"role": "assistant", "content": turn['ai']})
+        return messages
+
+    def recent(self, count: int) -> List[Dict[str, str]]:
+        return list(self.turns)[-count:] if count > 0 else []
+
+    def clear(self):
+        self.turns.clear()
+        self._turn_tokens.clear()
+        self.summary_lines.clear()
+        self.turn_count = 0
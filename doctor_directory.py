@@ -0,0 +1,124 @@
+"""
+Doctor directory for SleepMitra
+Doctor profiles used for recommendations and booking. Loaded once per process;
+DIRECTORY_VERSION identifies its contents so cached recommendations are
+invalidated when the directory changes.
+"""
+
+import hashlib
+import json
+
+# Doctor profiles database
+DOCTORS = [
+    {
+        'id': 'dr_rajesh_kumar',
+        'name': 'डॉ. राजेश कुमार',
+        'specialty': 'नींद चिकित्सा विशेषज्ञ',
+        'qualification': 'MD, Sleep Medicine, AIIMS',
+        'experience': '15+ वर्ष',
+        'languages': ['हिंदी', 'English', 'पंजाबी'],
+        'location': 'दिल्ली',
+        'clinic': 'SleepCare Clinic, CP',
+        'rating': 4.8,
+        'patients_treated': 2500,
+        'consultation_fee': 1500,
+        'availability': ['Monday', 'Wednesday', 'Friday'],
+        'time_slots': ['10:00 AM', '2:00 PM', '4:00 PM'],
+        'specialties': ['CBT-I', 'Sleep Apnea', 'Insomnia'],
+        'bio': 'नींद चिकित्सा में 15+ वर्ष का अनुभव। CBT-I और नींद विकारों के विशेषज्ञ।',
+        'image': '👨‍⚕️'
+    },
+    {
+        'id': 'dr_priya_sharma',
+        'name': 'डॉ. प्रिया शर्मा',
+        'specialty': 'मनोचिकित्सक और नींद विशेषज्ञ',
+        'qualification': 'MD Psychiatry, MBBS',
+        'experience': '12+ वर्ष',
+        'languages': ['हिंदी', 'English', 'मराठी'],
+        'location': 'मुंबई',
+        'clinic': 'Mind & Sleep Center, Bandra',
+        'rating': 4.9,
+        'patients_treated': 1800,
+        'consultation_fee': 2000,
+        'availability': ['Tuesday', 'Thursday', 'Saturday'],
+        'time_slots': ['11:00 AM', '3:00 PM', '5:00 PM'],
+        'specialties': ['Anxiety & Sleep', 'Depression & Insomnia', 'CBT-I'],
+        'bio': 'मनोचिकित्सा और नींद विकारों के विशेषज्ञ। चिंता और नींद की समस्याओं में विशेषज्ञता।',
+        'image': '👩‍⚕️'
+    },
+    {
+        'id': 'dr_amit_singh',
+        'name': 'डॉ. अमित सिंह',
+        'specialty': 'नींद चिकित्सा और श्वसन विशेषज्ञ',
+        'qualification': 'MD Pulmonology, Sleep Medicine',
+        'experience': '10+ वर्ष',
+        'languages': ['हिंदी', 'English', 'गुजराती'],
+        'location': 'अहमदाबाद',
+        'clinic': 'Respiratory & Sleep Clinic',
+        'rating': 4.7,
+        'patients_treated': 1200,
+        'consultation_fee': 1200,
+        'availability': ['Monday', 'Wednesday', 'Friday', 'Sunday'],
+        'time_slots': ['9:00 AM', '1:00 PM', '3:00 PM'],
+        'specialties': ['Sleep Apnea', 'Snoring', 'CBT-I'],
+        'bio': 'श्वसन और नींद विकारों के विशेषज्ञ। स्लीप एपनिया और खर्राटों के उपचार में विशेषज्ञता।',
+        'image': '👨‍⚕️'
+    },
+    {
+        'id': 'dr_sunita_reddy',
+        'name': 'डॉ. सुनीता रेड्डी',
+        'specialty': 'नींद चिकित्सा और मनोविज्ञान',
+        'qualification': 'PhD Psychology, Sleep Medicine',
+        'experience': '8+ वर्ष',
+        'languages': ['हिंदी', 'English', 'तेलुगु', 'तमिल'],
+        'location': 'बैंगलोर',
+        'clinic': 'Sleep Psychology Center',
+        'rating': 4.6,
+        'patients_treated': 900,
+        'consultation_fee': 1800,
+        'availability': ['Tuesday', 'Thursday', 'Saturday'],
+        'time_slots': ['10:30 AM', '2:30 PM', '4:30 PM'],
+        'specialties': ['Sleep Psychology', 'CBT-I', 'Relaxation Therapy'],
+        'bio': 'नींद मनोविज्ञान में विशेषज्ञ। CBT-I और रिलैक्सेशन थेरेपी में अनुभवी।',
+        'image': '👩‍⚕️'
+    },
+    {
+        'id': 'dr_vikram_jain',
+        'name': 'डॉ. विक्रम जैन',
+        'specialty': 'नींद चिकित्सा और न्यूरोलॉजी',
+        'qualification': 'MD Neurology, Sleep Medicine',
+        'experience': '18+ वर्ष',
+        'languages': ['हिंदी', 'English', 'राजस्थानी'],
+        'location': 'जयपुर',
+        'clinic': 'Neuro Sleep Center',
+        'rating': 4.9,
+        'patients_treated': 3000,
+        'consultation_fee': 2500,
+        'availability': ['Monday', 'Wednesday', 'Friday'],
+        'time_slots': ['9:30 AM', '1:30 PM', '3:30 PM'],
+        'specialties': ['Neurological Sleep Disorders', 'CBT-I', 'Sleep Studies'],
+        'bio': 'न्यूरोलॉजी और नींद चिकित्सा के वरिष्ठ विशेषज्ञ। जटिल नींद विकारों के उपचार में विशेषज्ञता।',
+        'image': '👨‍⚕️'
+    },
+    {
+        'id': 'dr_meera_patel',
+        'name': 'डॉ. मीरा पटेल',
+        'specialty': 'नींद चिकित्सा और व्यवहार चिकित्सा',
+        'qualification': 'MD, Behavioral Medicine, Sleep Therapy',
+        'experience': '6+ वर्ष',
+        'languages': ['हिंदी', 'English', 'गुजराती'],
+        'location': 'सूरत',
+        'clinic': 'Behavioral Sleep Clinic',
+        'rating': 4.5,
+        'patients_treated': 600,
+        'consultation_fee': 1000,
+        'availability': ['Tuesday', 'Thursday', 'Saturday'],
+        'time_slots': ['11:00 AM', '2:00 PM', '4:00 PM'],
+        'specialties': ['Behavioral Sleep Therapy', 'CBT-I', 'Sleep Hygiene'],
+        'bio': 'व्यवहार चिकित्सा और नींद थेरेपी में विशेषज्ञ। युवा वयस्कों में नींद की समस्याओं के उपचार में अनुभवी।',
+        'image': '👩‍⚕️'
+    }
+]
+
+# Content hash, computed once at import rather than on every rerun or lookup
+DIRECTORY_VERSION = hashlib.sha1(json.dumps(DOCTORS, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
@@ -0,0 +1,118 @@
+"""
+Intent matcher for the SleepMitra chatbot
+Compiles every intent keyword into a single Aho-Corasick automaton so a user
+message is scanned once, whatever the number of intents. Text is NFC
+normalized and Devanagari spelling variants (nukta, chandrabindu, nasal
+consonant + virama) are folded before matching.
+"""
+
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, List, Sequence, Set, Tuple
+
+NUKTA = '़'
+CHANDRABINDU = 'ँ'
+ANUSVARA = 'ं'
+VIRAMA = '्'
+
+# Nasal consonant + virama before another consonant is written as anusvara (हिन्दी -> हिंदी)
+_NASAL_CLUSTER = re.compile('[ङञणनम]' + VIRAMA + '(?=[क-ह])')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(text: str) -> str:
+    """Canonical form used for matching: NFC, lowercase, nukta/anusvara folded, single spaces"""
+    text = unicodedata.normalize('NFD', text)
+    # NFD splits precomposed nukta letters (क़ -> क + ़) so the nukta can simply be dropped
+    text = text.replace(NUKTA, '').replace(CHANDRABINDU, ANUSVARA)
+    text = unicodedata.normalize('NFC', text).lower()
+    text = _NASAL_CLUSTER.sub(ANUSVARA, text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class Intent:
+    """An intent fires when every keyword group has at least one hit"""
+
+    def __init__(self, name: str, keyword_groups: Sequence[Sequence[str]], priority: int = 0):
+        self.name = name
+        self.keyword_groups = [[normalize(k) for k in group] for group in keyword_groups]
+        self.priority = priority
+
+
+class IntentMatcher:
+    """Aho-Corasick automaton over all intent keywords"""
+
+    def __init__(self, intents: Sequence[Intent]):
+        self.intents = list(intents)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Terminal outputs per state: (intent index, group index, keyword length)
+        self._output: List[List[Tuple[int, int, int]]] = [[]]
+
+        for intent_index, intent in enumerate(self.intents):
+            for group_index, group in enumerate(intent.keyword_groups):
+                for keyword in group:
+                    self._add(keyword, (intent_index, group_index, len(keyword)))
+        self._build_failure_links()
+
+    def _add(self, keyword: str, output: Tuple[int, int, int]):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(output)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                # Inherit outputs of the longest proper suffix
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def scan(self, text: str) -> Dict[int, Dict[int, int]]:
+        """One pass over normalized text: matched characters per (intent, keyword group)"""
+        hits: Dict[int, Dict[int, int]] = {}
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for intent_index, group_index, length in self._output[state]:
+                groups = hits.setdefault(intent_index, {})
+                groups[group_index] = groups.get(group_index, 0) + length
+        return hits
+
+    def match(self, message: str) -> List[Tuple[str, float]]:
+        """Intents whose keyword groups are all satisfied, best first, with a 0-1 coverage score"""
+        text = normalize(message)
+        if not text:
+            return []
+
+        ranked = []
+        for intent_index, groups in self.scan(text).items():
+            intent = self.intents[intent_index]
+            if len(groups) < len(intent.keyword_groups):
+                continue
+            coverage = min(1.0, sum(groups.values()) / len(text))
+            ranked.append((intent.priority, coverage, intent.name))
+
+        ranked.sort(key=lambda item: (-item[0], -item[1]))
+        return [(name, coverage) for _, coverage, name in ranked]
+
+    def keywords(self) -> Set[str]:
+        return {keyword for intent in self.intents for group in intent.keyword_groups for keyword in group}
@@ -0,0 +1,148 @@
+"""
+Chatbot knowledge base for SleepMitra
+Loads the Hindi Q&A pairs from chatbot_knowledge.json and compiles them once
+per process into an immutable structure indexed by question, intent and
+keyword, shared read-only by every session. The file is watched and the
+knowledge base is rebuilt when it changes, so content can be edited live.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from intent_matcher import Intent, IntentMatcher, normalize
+from retrieval import NgramIndex
+
+logger = logging.getLogger(__name__)
+
+KB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot_knowledge.json")
+
+# Minimum seconds between checks of the file's modification time
+RELOAD_CHECK_INTERVAL = 2.0
+
+# Minimum retrieval confidence for a fuzzy match to be used instead of the fallback
+MIN_RETRIEVAL_CONFIDENCE = 0.25
+
+
+class KnowledgeBase:
+    """Immutable, indexed view of the chatbot knowledge base"""
+
+    def __init__(self, data: Dict, version: str = ""):
+        self.version = version
+        self.greeting: str = data['greeting']
+        self.fallback: Mapping = MappingProxyType({
+            'answer': data['fallback']['answer'],
+            'suggestions': tuple(data['fallback']['suggestions'])
+        })
+
+        entries = []
+        for raw in data['entries']:
+            entries.append(MappingProxyType({
+                'intent': raw['intent'],
+                'question': raw['question'],
+                'aliases': tuple(raw.get('aliases', ())),
+                'answer': raw['answer'],
+                'suggestions': tuple(raw.get('suggestions', ())),
+                'keywords': tuple(tuple(group) for group in raw.get('keywords', ())),
+                'priority': raw.get('priority', 0)
+            }))
+        self.entries: Tuple[Mapping, ...] = tuple(entries)
+
+        self.by_question: Mapping[str, Mapping] = MappingProxyType(
+            {normalize(entry['question']): entry for entry in self.entries}
+        )
+        self.by_intent: Mapping[str, Mapping] = MappingProxyType({entry['intent']: entry for entry in self.entries})
+        self._position: Mapping[str, int] = MappingProxyType(
+            {entry['intent']: position for position, entry in enumerate(self.entries)}
+        )
+
+        keyword_index: Dict[str, list] = {}
+        for entry in self.entries:
+            for group in entry['keywords']:
+                for keyword in group:
+                    keyword_index.setdefault(normalize(keyword), []).append(entry['intent'])
+        self.by_keyword: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+            {keyword: tuple(intents) for keyword, intents in keyword_index.items()}
+        )
+
+        self.matcher = IntentMatcher([
+            Intent(entry['intent'], entry['keywords'], entry['priority'])
+            for entry in self.entries if entry['keywords']
+        ])
+        self.index = NgramIndex([
+            {'question': [entry['question']], 'aliases': entry['aliases'], 'answer': [entry['answer']]}
+            for entry in self.entries
+        ])
+
+    def search(self, message: str, k: int = 3) -> List[Tuple[Mapping, float]]:
+        """Top-k entries by fuzzy similarity, with confidence"""
+        return [(self.entries[i], score) for i, score in self.index.search(message, k)]
+
+    def lookup(self, message: str) -> Tuple[Optional[Mapping], float, str]:
+        """Best entry for a message as (entry, confidence, method); entry is None when nothing matches"""
+        entry = self.by_question.get(normalize(message))
+        if entry is not None:
+            return entry, 1.0, 'exact'
+
+        matches = self.matcher.match(message)
+        if matches:
+            intent, coverage = matches[0]
+            # Keywords cover little of a long question, so fuzzy similarity to the same entry may vouch for it;
+            # a common word alone (low coverage, entry not similar) stays low confidence
+            similarity = float(self.index.scores(message)[self._position[intent]])
+            return self.by_intent[intent], max(coverage, similarity), 'keyword'
+
+        results = self.search(message, k=1)
+        if results and results[0][1] >= MIN_RETRIEVAL_CONFIDENCE:
+            entry, score = results[0]
+            return entry, score, 'retrieval'
+
+        return None, 0.0, 'none'
+
+    def answer(self, message: str) -> Mapping:
+        """Answer dict ({'answer', 'suggestions'}) for a message, falling back to the default reply"""
+        entry, _, _ = self.lookup(message)
+        return entry if entry is not None else self.fallback
+
+
+def load_knowledge_base(path: str = KB_PATH) -> KnowledgeBase:
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return KnowledgeBase(data, version=f"{data.get('version', 0)}:{os.path.getmtime(path)}")
+
+
+_knowledge_base: Optional[KnowledgeBase] = None
+_loaded_mtime: Optional[float] = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """Process-wide knowledge base, rebuilt when chatbot_knowledge.json changes on disk"""
+    global _knowledge_base, _loaded_mtime, _last_check
+    now = time.monotonic()
+    if _knowledge_base is not None and now - _last_check < RELOAD_CHECK_INTERVAL:
+        return _knowledge_base
+
+    with _lock:
+        _last_check = now
+        mtime = None
+        try:
+            # The file can be briefly missing while an editor or deploy replaces it
+            mtime = os.path.getmtime(KB_PATH)
+            if _knowledge_base is None or mtime != _loaded_mtime:
+                _knowledge_base = load_knowledge_base(KB_PATH)
+                _loaded_mtime = mtime
+        except (OSError, ValueError, KeyError) as e:
+            if _knowledge_base is None:
+                raise
+            # Keep serving the previous version if the file is missing or an edit left it invalid
+            logger.error("Could not reload knowledge base, keeping version %s: %s", _knowledge_base.version, e)
+            if mtime is not None:
+                # Do not retry the same broken file; a missing file is checked again next interval
+                _loaded_mtime = mtime
+        return _knowledge_base
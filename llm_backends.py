@@ -0,0 +1,311 @@
+"""
+LLM backends for SleepMitra
+One interface (complete, stream, batch) over interchangeable backends: the
+OpenAI API, a local CPU-hosted model through llama.cpp for air-gapped
+deployments, and a deterministic fake for tests. The backend is chosen by
+configuration, and each records call counts, latency and prompt/completion
+tokens per request so backends can be compared on the same prompts.
+"""
+
+import abc
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from conversation_memory import estimate_tokens
+from circuit_breaker import CircuitBreaker, CircuitOpenError, ProviderCall, get_circuit_breaker
+from llm_client import LLMBusyError, get_llm_client
+from prompt_builder import messages_tokens
+
+logger = logging.getLogger(__name__)
+
+Messages = List[Dict[str, str]]
+
+DEFAULT_BACKEND = "openai"
+DEFAULT_OPENAI_MODEL = "gpt-4"
+
+# Parallel requests used by batch()
+BATCH_CONCURRENCY = 4
+
+
+class LLMBackend(abc.ABC):
+    """Base class for LLM backends; subclasses implement _complete and may override _stream.
+
+    Every call goes through the circuit breaker. Hooks call `call.start()` once the request actually
+    reaches the model, so local queueing never counts against the provider's latency SLO.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str, breaker: Optional[CircuitBreaker] = None):
+        self.model = model
+        self.breaker = breaker
+        self.stats: Dict[str, float] = {'calls': 0, 'errors': 0, 'latency_ms_total': 0.0,
+                                        'prompt_tokens': 0, 'completion_tokens': 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def backend_id(self) -> str:
+        """Identifies the backend and model, e.g. for cache keys"""
+        return f"{self.name}:{self.model}"
+
+    def _record(self, ok: bool, started: float, messages: Messages, answer: str, call: ProviderCall):
+        latency_ms = (time.perf_counter() - started) * 1000
+        # The provider's own counts when it reported them, else local estimates
+        if call.usage is not None:
+            prompt_tokens, completion_tokens = call.usage
+            counted = "reported"
+        else:
+            prompt_tokens, completion_tokens = messages_tokens(messages), estimate_tokens(answer)
+            counted = "estimated"
+        with self._stats_lock:
+            self.stats['calls'] += 1
+            self.stats['errors'] += 0 if ok else 1
+            self.stats['latency_ms_total'] += latency_ms
+            self.stats['prompt_tokens'] += prompt_tokens
+            self.stats['completion_tokens'] += completion_tokens
+        logger.info("LLM %s %s: %d prompt + %d completion tokens (%s) in %.0f ms", self.backend_id,
+                    "ok" if ok else "failed", prompt_tokens, completion_tokens, counted, latency_ms)
+
+    @abc.abstractmethod
+    def _complete(self, messages: Messages, max_tokens: int, temperature: float, call: ProviderCall) -> str:
+        """Full answer text; call `call.start()` when the request reaches the model"""
+
+    def _stream(self, messages: Messages, max_tokens: int, temperature: float, call: ProviderCall) -> Iterator[str]:
+        # Backends without native streaming deliver the whole answer as one chunk
+        yield self._complete(messages, max_tokens, temperature, call)
+
+    def _admit(self) -> ProviderCall:
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenError("AI service is temporarily unavailable")
+        return ProviderCall()
+
+    def _settle(self, call: ProviderCall, ok: Optional[bool]):
+        """Report a provider verdict to the breaker; None means the provider was not at fault"""
+        if self.breaker is None:
+            return
+        if ok is None or call.started is None:
+            # Refused locally, failed before reaching the model, or abandoned before it answered
+            self.breaker.release()
+        else:
+            self.breaker.record(ok, call.latency_ms)
+
+    def complete(self, messages: Messages, max_tokens: int = 300, temperature: float = 0.7) -> str:
+        call = self._admit()
+        started = time.perf_counter()
+        ok = False
+        verdict: Optional[bool] = False
+        answer = ""
+        try:
+            answer = self._complete(messages, max_tokens, temperature, call)
+            ok = verdict = True
+            return answer
+        except LLMBusyError:
+            verdict = None
+            raise
+        finally:
+            self._record(ok, started, messages, answer, call)
+            self._settle(call, verdict)
+
+    def stream(self, messages: Messages, max_tokens: int = 300, temperature: float = 0.7) -> Iterator[str]:
+        call = self._admit()
+        started = time.perf_counter()
+        ok = False
+        verdict: Optional[bool] = False
+        parts: List[str] = []
+        try:
+            for delta in self._stream(messages, max_tokens, temperature, call):
+                call.first_token()
+                parts.append(delta)
+                yield delta
+            ok = verdict = True
+        except GeneratorExit:
+            # The reader stopped early, which is not a backend error; the provider was healthy if it had answered
+            ok = True
+            verdict = True if parts else None
+            raise
+        except LLMBusyError:
+            verdict = None
+            raise
+        finally:
+            self._record(ok, started, messages, "".join(parts), call)
+            self._settle(call, verdict)
+
+    def batch(self, conversations: List[Messages], max_tokens: int = 300, temperature: float = 0.7) -> List[str]:
+        """Complete several independent conversations, in order"""
+        with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as executor:
+            return list(executor.map(lambda messages: self.complete(messages, max_tokens, temperature), conversations))
+
+    def mean_latency_ms(self) -> float:
+        with self._stats_lock:
+            return self.stats['latency_ms_total'] / self.stats['calls'] if self.stats['calls'] else 0.0
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI chat completions through the shared pooled client"""
+
+    name = "openai"
+
+    def __init__(self, client, model: str = DEFAULT_OPENAI_MODEL, breaker: Optional[CircuitBreaker] = None):
+        super().__init__(model, breaker)
+        self.client = client
+
+    def _complete(self, messages: Messages, max_tokens: int, temperature: float, call: ProviderCall) -> str:
+        return self.client.complete(messages, model=self.model, call=call, max_tokens=max_tokens,
+                                    temperature=temperature)
+
+    def _stream(self, messages: Messages, max_tokens: int, temperature: float, call: ProviderCall) -> Iterator[str]:
+        return self.client.stream(messages, model=self.model, call=call, max_tokens=max_tokens,
+                                  temperature=temperature)
+
+
+class LocalBackend(LLMBackend):
+    """GGUF chat model run on the CPU with llama-cpp-python (optional dependency)"""
+
+    name = "local"
+
+    def __init__(self, model_path: str, n_ctx: int = 4096, n_threads: Optional[int] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        super().__init__(os.path.basename(model_path), breaker)
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self._llm = None
+        # A llama.cpp context serves one generation at a time
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._llm is None:
+            try:
+                from llama_cpp import Llama
+            except ImportError as e:
+                raise RuntimeError("Local backend needs llama-cpp-python: pip install llama-cpp-python") from e
+            logger.info("Loading local model %s", self.model_path)
+            self._llm = Llama(model_path=self.model_path, n_ctx=self.n_ctx, n_threads=self.n_threads, verbose=False)
+        return self._llm
+
+    def _complete(self, messages: Messages, max_tokens: int, temperature: float, call: ProviderCall) -> str:
+        with self._lock:
+            llm = self._load()
+            call.start()
+            result = llm.create_chat_completion(messages=messages, max_tokens=max_tokens, temperature=temperature)
+        usage = result.get('usage')
+        if usage:
+            call.usage = (usage['prompt_tokens'], usage['completion_tokens'])
+        return result['choices'][0]['message'].get('content') or ""
+
+    def _stream(self, messages: Messages, max_tokens: int, temperature: float, call: ProviderCall) -> Iterator[str]:
+        with self._lock:
+            llm = self._load()
+            call.start()
+            for chunk in llm.create_chat_completion(messages=messages, max_tokens=max_tokens,
+                                                    temperature=temperature, stream=True):
+                content = chunk['choices'][0]['delta'].get('content')
+                if content:
+                    yield content
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic offline backend: the same prompt always gets the same answer"""
+
+    name = "fake"
+
+    ANSWERS = [
+        "देखिए, रोज़ एक ही समय पर सोने और उठने की आदत डालिए।",
+        "सोने से एक घंटा पहले मोबाइल और टीवी से दूर रहिए।",
+        "शाम के बाद चाय-कॉफ़ी कम कीजिए और कमरे को अंधेरा व ठंडा रखिए।",
+        "अगर तीन हफ्ते से ज़्यादा नींद की दिक्कत है तो डॉक्टर से ज़रूर मिलिए।"
+    ]
+
+    def __init__(self, model: str = "fake", latency: float = 0.0, token_delay: float = 0.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        super().__init__(model, breaker)
+        self.latency = latency
+        self.token_delay = token_delay
+
+    def _answer(self, messages: Messages) -> str:
+        question = messages[-1]['content'] if messages else ""
+        digest = hashlib.sha256(question.encode('utf-8')).digest()
+        return self.ANSWERS[digest[0] % len(self.ANSWERS)]
+
+    def _complete(self, messages: Messages, max_tokens: int, temperature: float, call: ProviderCall) -> str:
+        call.start()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(messages)
+
+    def _stream(self, messages: Messages, max_tokens: int, temperature: float, call: ProviderCall) -> Iterator[str]:
+        call.start()
+        if self.latency:
+            time.sleep(self.latency)
+        for i, word in enumerate(self._answer(messages).split(' ')):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else ' ' + word
+
+
+def configured_backend_name() -> str:
+    return os.getenv("SLEEPMITRA_LLM_BACKEND", DEFAULT_BACKEND).strip().lower()
+
+
+def build_backend_from_env() -> Optional[LLMBackend]:
+    """Backend selected by SLEEPMITRA_LLM_BACKEND (openai, local or fake); None if it is not configured"""
+    name = configured_backend_name()
+    if name == "fake":
+        return FakeBackend(latency=float(os.getenv("SLEEPMITRA_FAKE_LLM_LATENCY", "0")),
+                           token_delay=float(os.getenv("SLEEPMITRA_FAKE_LLM_TOKEN_DELAY", "0")),
+                           breaker=get_circuit_breaker())
+    if name == "local":
+        model_path = os.getenv("SLEEPMITRA_LOCAL_MODEL_PATH")
+        if not model_path:
+            logger.error("SLEEPMITRA_LLM_BACKEND=local needs SLEEPMITRA_LOCAL_MODEL_PATH")
+            return None
+        return LocalBackend(model_path, n_ctx=int(os.getenv("SLEEPMITRA_LOCAL_MODEL_CONTEXT", "4096")),
+                            breaker=get_circuit_breaker())
+    if name != "openai":
+        logger.error("Unknown LLM backend %r, using openai", name)
+
+    client = get_llm_client()
+    if client is None:
+        return None
+    return OpenAIBackend(client, model=os.getenv("SLEEPMITRA_LLM_MODEL", DEFAULT_OPENAI_MODEL),
+                         breaker=get_circuit_breaker())
+
+
+_backend: Optional[LLMBackend] = None
+_backend_error: Optional[str] = None
+_backend_lock = threading.Lock()
+
+
+def get_llm_backend() -> Optional[LLMBackend]:
+    """Process-wide backend, or None while the selected backend is not configured (e.g. no API key) or
+    could not be built; backend_unavailable_reason() says which"""
+    global _backend, _backend_error
+    if _backend is not None:
+        return _backend
+    with _backend_lock:
+        if _backend is None:
+            try:
+                _backend = build_backend_from_env()
+                _backend_error = None
+            except Exception as e:
+                # E.g. a missing dependency; callers show a message instead of failing the page
+                logger.exception("Could not build the %s LLM backend", configured_backend_name())
+                _backend_error = f"{type(e).__name__}: {e}"
+        return _backend
+
+
+def backend_unavailable_reason() -> Optional[str]:
+    """Why the last get_llm_backend() call returned None, or None if it was just not configured"""
+    return _backend_error
+
+
+def backend_setup_hint() -> str:
+    """What to configure so the selected backend can be built"""
+    if configured_backend_name() == "local":
+        return "Set SLEEPMITRA_LOCAL_MODEL_PATH to a GGUF model file."
+    return "Please add OPENAI_API_KEY to Streamlit secrets or the environment."
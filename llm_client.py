@@ -0,0 +1,162 @@
+"""
+Shared LLM client for SleepMitra
+One process-wide OpenAI client: the API key is resolved once, HTTP connections
+are pooled and kept alive, every request has a timeout, transient failures are
+retried with jittered exponential backoff, and the number of concurrent
+upstream calls is capped. The circuit breaker wraps this client in
+llm_backends, which it informs of when a request actually reaches the API.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import openai
+
+from circuit_breaker import ProviderCall
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Errors worth retrying; anything else (bad request, auth) fails immediately
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError,
+                    openai.InternalServerError)
+
+
+class LLMBusyError(RuntimeError):
+    """Raised when no upstream slot frees up within the wait limit"""
+
+
+def resolve_api_key() -> Optional[str]:
+    """OPENAI_API_KEY from Streamlit secrets, falling back to the environment"""
+    try:
+        import streamlit as st
+        api_key = st.secrets.get("OPENAI_API_KEY")
+        if api_key:
+            return api_key
+    except Exception:
+        # No secrets file, or not running under Streamlit
+        pass
+    return os.getenv("OPENAI_API_KEY")
+
+
+class LLMClient:
+    """Pooled OpenAI chat client with timeouts, retries and a concurrency cap"""
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, max_retries: int = DEFAULT_MAX_RETRIES,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, backoff_base: float = 0.5, backoff_cap: float = 8.0):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_concurrency = max_concurrency
+        self.stats: Dict[str, int] = {'requests': 0, 'retries': 0, 'failures': 0}
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+
+        # The SDK's own HTTP client keeps connections alive, and this client is shared process-wide, so
+        # connections are reused across requests; the concurrency cap bounds how many are open at once.
+        # Retries are handled here so backoff and the concurrency cap apply to every attempt
+        self._client = openai.OpenAI(api_key=api_key, base_url=base_url,
+                                     timeout=openai.Timeout(timeout, connect=connect_timeout), max_retries=0)
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(cap, base * 2^attempt)]"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _admit(self, call: Optional[ProviderCall]):
+        # Waiting for a local slot is our own load, not the provider's, so the clock starts afterwards
+        if not self._slots.acquire(timeout=self.timeout):
+            raise LLMBusyError("Too many concurrent AI requests")
+        if call is not None:
+            call.start()
+
+    def _create(self, **kwargs: Any):
+        """chat.completions.create with jittered retries on transient errors"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._client.chat.completions.create(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    self._count('failures')
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning("LLM request failed (%s), retrying in %.2fs", type(e).__name__, delay)
+                self._count('retries')
+                time.sleep(delay)
+
+    @staticmethod
+    def _note_usage(call: Optional[ProviderCall], usage: Any):
+        if call is not None and usage is not None:
+            call.usage = (usage.prompt_tokens, usage.completion_tokens)
+
+    def chat(self, messages: List[Dict[str, str]], model: str, call: Optional[ProviderCall] = None, **kwargs: Any):
+        """chat.completions.create with retries; use stream() for streamed responses"""
+        self._admit(call)
+        try:
+            self._count('requests')
+            return self._create(model=model, messages=messages, **kwargs)
+        finally:
+            self._slots.release()
+
+    def complete(self, messages: List[Dict[str, str]], model: str, call: Optional[ProviderCall] = None,
+                 **kwargs: Any) -> str:
+        """Text of the first choice; the reported token usage is left on call"""
+        response = self.chat(messages, model, call=call, **kwargs)
+        self._note_usage(call, response.usage)
+        return response.choices[0].message.content or ""
+
+    def stream(self, messages: List[Dict[str, str]], model: str, call: Optional[ProviderCall] = None,
+               **kwargs: Any) -> Iterator[str]:
+        """Text deltas of the first choice as they arrive.
+
+        Retries only cover opening the stream; the concurrency slot is held until the stream is consumed.
+        The reported token usage arrives in a final chunk without choices and is left on call.
+        """
+        self._admit(call)
+        try:
+            self._count('requests')
+            stream = self._create(model=model, messages=messages, stream=True,
+                                  stream_options={"include_usage": True}, **kwargs)
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                self._note_usage(call, getattr(chunk, 'usage', None))
+        finally:
+            self._slots.release()
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> Optional[LLMClient]:
+    """Process-wide client, or None while no API key is configured"""
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            api_key = resolve_api_key()
+            if not api_key:
+                return None
+            _client = LLMClient(
+                api_key,
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                timeout=float(os.getenv("SLEEPMITRA_LLM_TIMEOUT", DEFAULT_TIMEOUT)),
+                max_retries=int(os.getenv("SLEEPMITRA_LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+                max_concurrency=int(os.getenv("SLEEPMITRA_LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+            )
+        return _client
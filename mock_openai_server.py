@@ -0,0 +1,222 @@
+"""
+Mock OpenAI server for SleepMitra
+A local stand-in for the chat completions endpoint (POST /v1/chat/completions,
+plain and streaming) with configurable latency, error rate and token rate, so
+the AI path can be exercised and benchmarked without the real API.
+
+Run it standalone and point the app at it:
+
+    python mock_openai_server.py --port 8765 --latency 0.3 --tokens-per-second 40
+    OPENAI_API_KEY=mock OPENAI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run streamlit_app.py
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from conversation_memory import estimate_tokens
+from prompt_builder import messages_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANSWER = ("देखिए, रोज़ एक ही समय पर सोइए और उठिए। सोने से एक घंटा पहले मोबाइल बंद कर दीजिए, "
+                  "शाम के बाद चाय-कॉफ़ी मत लीजिए, और अगर नींद न आए तो बिस्तर से उठकर कुछ शांत काम कीजिए।")
+
+
+class MockSettings:
+    """Behaviour of the mock endpoint; may be changed while the server runs"""
+
+    def __init__(self, latency: float = 0.0, tokens_per_second: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 500, answer: str = DEFAULT_ANSWER, seed: Optional[int] = None):
+        self.latency = latency                      # seconds before the first byte
+        self.tokens_per_second = tokens_per_second  # 0 = the whole answer at once
+        self.error_rate = error_rate                # fraction of requests failed with error_status
+        self.error_status = error_status
+        self.answer = answer
+        self.stats: Dict[str, int] = {'requests': 0, 'streams': 0, 'errors': 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def admit(self, stream: bool) -> bool:
+        """Count the request; False if it should fail"""
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['streams'] += 1 if stream else 0
+            failed = self._random.random() < self.error_rate
+            self.stats['errors'] += 1 if failed else 0
+            return not failed
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the client's connection pool is exercised
+    server: "MockOpenAIServer"
+
+    def log_message(self, format: str, *args: Any):
+        logger.debug(format, *args)
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str):
+        self._send_json(status, {'error': {'message': message, 'type': 'mock_error', 'code': status}})
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'mock', 'object': 'model', 'owned_by': 'mock'}]})
+        else:
+            self._send_error(404, f"Unknown path {self.path}")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_error(400, "Request body is not JSON")
+            return
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_error(404, f"Unknown path {self.path}")
+            return
+
+        settings = self.server.settings
+        stream = bool(request.get('stream'))
+        ok = settings.admit(stream)
+        if settings.latency:
+            time.sleep(settings.latency)
+        if not ok:
+            self._send_error(settings.error_status, "Mock failure")
+            return
+
+        answer, prompt_tokens = self._answer(request)
+        if stream:
+            self._stream(request, answer, prompt_tokens)
+        else:
+            self._send_json(200, self._completion(request, answer, prompt_tokens))
+
+    def _answer(self, request: Dict[str, Any]) -> Tuple[str, int]:
+        settings = self.server.settings
+        words = settings.answer.split(' ')
+        max_tokens = request.get('max_tokens')
+        if max_tokens:
+            # Stop roughly where the model would run out of tokens
+            kept, used = [], 0
+            for word in words:
+                used += estimate_tokens(word + ' ')
+                if used > max_tokens and kept:
+                    break
+                kept.append(word)
+            words = kept
+        return ' '.join(words), messages_tokens(request.get('messages') or [])
+
+    @staticmethod
+    def _envelope(request: Dict[str, Any], kind: str) -> Dict[str, Any]:
+        return {'id': f"chatcmpl-mock-{uuid.uuid4().hex[:12]}", 'object': kind, 'created': int(time.time()),
+                'model': request.get('model', 'mock')}
+
+    @staticmethod
+    def _usage(answer: str, prompt_tokens: int) -> Dict[str, int]:
+        completion_tokens = estimate_tokens(answer)
+        return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens}
+
+    def _completion(self, request: Dict[str, Any], answer: str, prompt_tokens: int) -> Dict[str, Any]:
+        body = self._envelope(request, 'chat.completion')
+        body['choices'] = [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}]
+        body['usage'] = self._usage(answer, prompt_tokens)
+        return body
+
+    def _chunks(self, request: Dict[str, Any], answer: str, prompt_tokens: int) -> Iterator[Dict[str, Any]]:
+        envelope = self._envelope(request, 'chat.completion.chunk')
+        deltas = [{'role': 'assistant', 'content': ''}]
+        deltas += [{'content': word if i == 0 else ' ' + word} for i, word in enumerate(answer.split(' '))]
+        for delta in deltas:
+            yield dict(envelope, choices=[{'index': 0, 'delta': delta, 'finish_reason': None}])
+        yield dict(envelope, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+        if (request.get('stream_options') or {}).get('include_usage'):
+            # Like the API: one last chunk with no choices and the usage of the whole request
+            yield dict(envelope, choices=[], usage=self._usage(answer, prompt_tokens))
+
+    def _write_chunk(self, data: bytes):
+        # HTTP/1.1 chunked transfer encoding
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, request: Dict[str, Any], answer: str, prompt_tokens: int):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        tokens_per_second = self.server.settings.tokens_per_second
+        try:
+            for chunk in self._chunks(request, answer, prompt_tokens):
+                content = chunk['choices'][0]['delta'].get('content') if chunk['choices'] else None
+                if content and tokens_per_second:
+                    time.sleep(estimate_tokens(content) / tokens_per_second)
+                self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading
+            self.close_connection = True
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], settings: MockSettings):
+        super().__init__(address, MockOpenAIHandler)
+        self.settings = settings
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_mock_server(settings: Optional[MockSettings] = None, host: str = "127.0.0.1",
+                      port: int = 0) -> MockOpenAIServer:
+    """Serve in a background thread (port 0 picks a free port); stop with server.shutdown()"""
+    server = MockOpenAIServer((host, port), settings or MockSettings())
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    logger.info("Mock OpenAI server listening on %s", server.base_url)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response starts")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="streaming rate (0 = unthrottled)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of failed requests")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    settings = MockSettings(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                            error_rate=args.error_rate, error_status=args.error_status, seed=args.seed)
+    server = MockOpenAIServer((args.host, args.port), settings)
+    print(f"Mock OpenAI server on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Notification delivery for SleepMitra
+An asyncio worker running on its own thread that drains due therapy reminders
+and booking confirmations in batches to pluggable channels (SMTP, SMS gateway,
+webhook) with a concurrency cap, retries with jittered backoff and dedupe.
+Streamlit sessions only enqueue messages and never wait on delivery.
+"""
+
+import abc
+import asyncio
+import logging
+import os
+import random
+import smtplib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from reminder_scheduler import get_reminder_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Notification:
+    """One message for one channel; `key` identifies it for dedupe"""
+    key: str
+    channel: str
+    recipient: str
+    subject: str
+    body: str
+
+
+class PartialDeliveryError(Exception):
+    """Raised by a channel when only part of a batch went out; `remaining` lists what was not sent"""
+
+    def __init__(self, remaining: List[Notification], cause: BaseException):
+        super().__init__(f"{len(remaining)} notifications not sent: {cause}")
+        self.remaining = remaining
+
+
+class DeliveryChannel(abc.ABC):
+    """Base class for delivery channels; send_batch raises on failure so the worker can retry"""
+
+    name = "base"
+
+    @abc.abstractmethod
+    async def send_batch(self, notifications: List[Notification]):
+        """Send the whole batch, or raise (PartialDeliveryError if some of it was already sent)"""
+
+
+class SmtpChannel(DeliveryChannel):
+    """Sends a batch of e-mails over a single SMTP connection"""
+
+    name = "email"
+
+    def __init__(self, host: str, port: int = 587, username: Optional[str] = None,
+                 password: Optional[str] = None, sender: str = "noreply@sleepmitra.in",
+                 use_tls: bool = True, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def _send_sync(self, notifications: List[Notification]):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as server:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password or "")
+            for index, notification in enumerate(notifications):
+                message = EmailMessage()
+                message['From'] = self.sender
+                message['To'] = notification.recipient
+                message['Subject'] = notification.subject
+                message.set_content(notification.body)
+                try:
+                    server.send_message(message)
+                except Exception as e:
+                    if index == 0:
+                        raise
+                    # Recipients before this one already have their e-mail; only retry the rest
+                    raise PartialDeliveryError(notifications[index:], e) from e
+
+    async def send_batch(self, notifications: List[Notification]):
+        await asyncio.to_thread(self._send_sync, notifications)
+
+
+class SmsGatewayChannel(DeliveryChannel):
+    """Posts a batch of SMS messages to an HTTP SMS gateway in one request"""
+
+    name = "sms"
+
+    def __init__(self, url: str, api_key: Optional[str] = None, timeout: float = 10.0):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _post_sync(self, notifications: List[Notification]):
+        headers = {'Authorization': f"Bearer {self.api_key}"} if self.api_key else {}
+        payload = {'messages': [{'to': n.recipient, 'text': n.body} for n in notifications]}
+        response = self.session.post(self.url, json=payload, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+
+    async def send_batch(self, notifications: List[Notification]):
+        await asyncio.to_thread(self._post_sync, notifications)
+
+
+class WebhookChannel(DeliveryChannel):
+    """Posts a batch of notifications as JSON to a webhook (e.g. a WhatsApp bridge)"""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _post_sync(self, notifications: List[Notification]):
+        payload = {'notifications': [
+            {'key': n.key, 'to': n.recipient, 'subject': n.subject, 'text': n.body}
+            for n in notifications
+        ]}
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    async def send_batch(self, notifications: List[Notification]):
+        await asyncio.to_thread(self._post_sync, notifications)
+
+
+class FakeGateway(DeliveryChannel):
+    """In-memory stand-in for a real gateway, for tests and local runs"""
+
+    def __init__(self, name: str = "fake", latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.name = name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.batches: List[List[Notification]] = []
+        self.lock = threading.Lock()
+
+    @property
+    def sent(self) -> List[Notification]:
+        with self.lock:
+            return [n for batch in self.batches for n in batch]
+
+    async def send_batch(self, notifications: List[Notification]):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            raise ConnectionError(f"{self.name} gateway unavailable")
+        with self.lock:
+            self.batches.append(list(notifications))
+
+
+class DeliveryWorker:
+    """Batched asynchronous delivery on a dedicated event loop thread"""
+
+    def __init__(self, channels: Dict[str, DeliveryChannel], batch_size: int = 50,
+                 linger: float = 0.2, max_concurrency: int = 8, max_retries: int = 4,
+                 base_backoff: float = 0.5, dedupe_size: int = 100000):
+        self.channels = channels
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.dedupe_size = dedupe_size
+        self.stats = {'submitted': 0, 'deduped': 0, 'sent': 0, 'failed': 0, 'retries': 0, 'batches': 0}
+
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the event loop thread (idempotent)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_loop, name="notification-delivery", daemon=True)
+                self._thread.start()
+        self._ready.wait()
+
+    def submit(self, notification: Notification) -> bool:
+        """Queue a notification from any thread; returns False if it is a duplicate or has no channel"""
+        if notification.channel not in self.channels:
+            return False
+
+        with self._lock:
+            if notification.key in self._seen:
+                self.stats['deduped'] += 1
+                return False
+            self._seen[notification.key] = None
+            if len(self._seen) > self.dedupe_size:
+                self._seen.popitem(last=False)
+            self.stats['submitted'] += 1
+
+        self.start()
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, notification)
+        return True
+
+    def wait_idle(self, timeout: float = 10.0) -> bool:
+        """Block until everything queued so far has been delivered or given up on"""
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._queue.join(), self._loop)
+        try:
+            future.result(timeout)
+            return True
+        except Exception:
+            return False
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        self._loop.run_until_complete(self._dispatch())
+
+    async def _dispatch(self):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        while True:
+            batches = await self._collect()
+            for channel_name, batch in batches.items():
+                await semaphore.acquire()
+                task = asyncio.create_task(self._deliver(self.channels[channel_name], batch))
+                task.add_done_callback(lambda _task, count=len(batch): self._finish(semaphore, count))
+
+    def _finish(self, semaphore: asyncio.Semaphore, count: int):
+        semaphore.release()
+        for _ in range(count):
+            self._queue.task_done()
+
+    async def _collect(self) -> Dict[str, List[Notification]]:
+        """Wait for one notification, then linger briefly to fill up a batch"""
+        first = await self._queue.get()
+        batches: Dict[str, List[Notification]] = {first.channel: [first]}
+        total = 1
+        deadline = time.monotonic() + self.linger
+        while total < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                notification = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batches.setdefault(notification.channel, []).append(notification)
+            total += 1
+        return batches
+
+    async def _deliver(self, channel: DeliveryChannel, batch: List[Notification]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await channel.send_batch(batch)
+                with self._lock:
+                    self.stats['sent'] += len(batch)
+                    self.stats['batches'] += 1
+                return
+            except Exception as e:
+                if isinstance(e, PartialDeliveryError):
+                    with self._lock:
+                        self.stats['sent'] += len(batch) - len(e.remaining)
+                    batch = e.remaining
+                if attempt == self.max_retries:
+                    logger.warning("Giving up on %d %s notifications: %s", len(batch), channel.name, e)
+                    with self._lock:
+                        self.stats['failed'] += len(batch)
+                    return
+                with self._lock:
+                    self.stats['retries'] += 1
+                # Exponential backoff with full jitter
+                await asyncio.sleep(random.uniform(0, self.base_backoff * (2 ** attempt)))
+
+
+def build_channels_from_env() -> Dict[str, DeliveryChannel]:
+    """Configure channels from environment variables (Streamlit exposes root-level secrets as env vars)"""
+    channels: Dict[str, DeliveryChannel] = {}
+    if os.getenv("SLEEPMITRA_SMTP_HOST"):
+        channels['email'] = SmtpChannel(
+            host=os.environ["SLEEPMITRA_SMTP_HOST"],
+            port=int(os.getenv("SLEEPMITRA_SMTP_PORT", "587")),
+            username=os.getenv("SLEEPMITRA_SMTP_USER"),
+            password=os.getenv("SLEEPMITRA_SMTP_PASSWORD"),
+            sender=os.getenv("SLEEPMITRA_SMTP_SENDER", "noreply@sleepmitra.in")
+        )
+    if os.getenv("SLEEPMITRA_SMS_GATEWAY_URL"):
+        channels['sms'] = SmsGatewayChannel(os.environ["SLEEPMITRA_SMS_GATEWAY_URL"], os.getenv("SLEEPMITRA_SMS_API_KEY"))
+    if os.getenv("SLEEPMITRA_WEBHOOK_URL"):
+        channels['webhook'] = WebhookChannel(os.environ["SLEEPMITRA_WEBHOOK_URL"])
+    if os.getenv("SLEEPMITRA_FAKE_GATEWAY"):
+        # Local stand-ins for every channel that is not configured for real
+        for name in ('email', 'sms', 'webhook'):
+            channels.setdefault(name, FakeGateway(name))
+    return channels
+
+
+def notifications_for(key: str, channels: Dict[str, DeliveryChannel], subject: str, body: str,
+                      phone: Optional[str] = None, email: Optional[str] = None) -> List[Notification]:
+    """Fan a message out to every configured channel the recipient can be reached on"""
+    recipients = {'sms': phone, 'email': email, 'webhook': phone or email}
+    return [
+        Notification(key=f"{key}:{name}", channel=name, recipient=recipients[name], subject=subject, body=body)
+        for name in channels
+        if recipients.get(name)
+    ]
+
+
+_worker: Optional[DeliveryWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_delivery_worker() -> DeliveryWorker:
+    """Process-wide delivery worker, subscribed to the reminder scheduler on first use"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = DeliveryWorker(build_channels_from_env())
+            get_reminder_scheduler().add_listener(_deliver_due_reminder)
+        return _worker
+
+
+def _deliver_due_reminder(owner: str, reminder_id: str, payload: Optional[Dict[str, Any]]):
+    """Scheduler listener: fan a fired reminder out to the user's channels"""
+    if not payload:
+        return
+    worker = get_delivery_worker()
+    for notification in notifications_for(
+        f"reminder:{owner}:{reminder_id}", worker.channels, "SleepMitra रिमाइंडर",
+        payload['message'], payload.get('phone'), payload.get('email')
+    ):
+        worker.submit(notification)
+
+
+def send_booking_confirmation(owner: str, booking: Dict[str, Any]):
+    """Queue confirmations for a new appointment booking"""
+    worker = get_delivery_worker()
+    body = (f"SleepMitra: {booking['doctor_name']} के साथ आपकी अपॉइंटमेंट {booking['date']} को "
+            f"{booking['time']} बजे बुक हो गई है ({booking['type']})।")
+    for notification in notifications_for(
+        f"booking:{owner}:{booking['timestamp']}", worker.channels, "SleepMitra अपॉइंटमेंट पुष्टि",
+        body, booking.get('patient_phone'), booking.get('patient_email')
+    ):
+        worker.submit(notification)
@@ -0,0 +1,194 @@
+"""
+Therapy plan documents for SleepMitra
+Renders downloadable therapy plan exports (plain text and Markdown) from
+templates, using the assessment result, the plan from create_therapy_plan and
+the therapy module catalog. Output is content-addressed: documents are cached
+by a hash of their inputs and only rendered when a download is requested.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from string import Template
+from typing import Dict, List, Optional, Tuple
+
+from therapy_catalog import THERAPY_MODULES, get_module
+
+# Documents kept in memory (least recently used first out)
+MAX_CACHED_DOCUMENTS = 256
+
+FORMATS = {
+    'text': {'extension': 'txt', 'mime': 'text/plain'},
+    'markdown': {'extension': 'md', 'mime': 'text/markdown'}
+}
+
+WEEKLY_PROGRAM = [
+    ('सप्ताह 1: नींद स्वच्छता', [
+        'नियमित सोने का समय निर्धारित करें',
+        'बेडरूम को ठंडा और अंधेरा रखें',
+        'सोने से 1 घंटे पहले स्क्रीन से दूर रहें',
+        'कैफीन का सेवन कम करें'
+    ]),
+    ('सप्ताह 2: रिलैक्सेशन तकनीकें', [
+        'प्रगतिशील मांसपेशी रिलैक्सेशन सीखें',
+        'गहरी सांस लेने की तकनीक अभ्यास करें',
+        'मेडिटेशन शुरू करें',
+        'सोने से पहले रिलैक्सेशन रूटीन बनाएं'
+    ]),
+    ('सप्ताह 3-4: CBT-I तकनीकें', [
+        'नींद प्रतिबंध तकनीक सीखें',
+        'संज्ञानात्मक पुनर्गठन अभ्यास करें',
+        'नींद डायरी रखना जारी रखें',
+        'प्रगति का मूल्यांकन करें'
+    ])
+]
+
+GENERAL_TIPS = [
+    'नियमित सोने का समय निर्धारित करें',
+    'बेडरूम को ठंडा, अंधेरा और शांत रखें',
+    'सोने से 1 घंटे पहले स्क्रीन से दूर रहें',
+    'कैफीन और शराब से बचें',
+    'रिलैक्सेशन तकनीकों का उपयोग करें',
+    'नियमित व्यायाम करें'
+]
+
+TEMPLATES = {
+    'text': {
+        'personal': Template(
+            "नींद साथी - व्यक्तिगत चिकित्सा योजना\n\n"
+            "आकलन परिणाम:\n"
+            "- ISI स्कोर: $total_score\n"
+            "- गंभीरता: $severity\n\n"
+            "अनुशंसित चिकित्सा:\n$recommendations\n\n"
+            "$plan_section"
+            "चिकित्सा कार्यक्रम:\n$program\n\n"
+            "वीडियो लिंक्स:\n$videos\n\n"
+            "तैयार किया गया: $prepared_on\n"
+            "SleepMitra - Hindi Insomnia Management System"
+        ),
+        'general': Template(
+            "नींद साथी - सामान्य चिकित्सा योजना\n\n"
+            "सामान्य नींद स्वच्छता सुझाव:\n$tips\n\n"
+            "वीडियो लिंक्स:\n$videos\n\n"
+            "तैयार किया गया: $prepared_on\n"
+            "SleepMitra - Hindi Insomnia Management System"
+        ),
+        'plan': Template("आपकी योजना: $name ($duration_weeks सप्ताह)\n$modules\n\n"),
+        'bullet': Template("• $text"),
+        'heading': Template("$text"),
+        'video': Template("$number. $name: $url"),
+        'module': Template("• सप्ताह $week: $icon $name ($duration) - $required")
+    },
+    'markdown': {
+        'personal': Template(
+            "# नींद साथी - व्यक्तिगत चिकित्सा योजना\n\n"
+            "## आकलन परिणाम\n\n"
+            "- **ISI स्कोर:** $total_score\n"
+            "- **गंभीरता:** $severity\n\n"
+            "## अनुशंसित चिकित्सा\n\n$recommendations\n\n"
+            "$plan_section"
+            "## चिकित्सा कार्यक्रम\n\n$program\n\n"
+            "## वीडियो लिंक्स\n\n$videos\n\n"
+            "---\n\n*तैयार किया गया: $prepared_on* — SleepMitra - Hindi Insomnia Management System\n"
+        ),
+        'general': Template(
+            "# नींद साथी - सामान्य चिकित्सा योजना\n\n"
+            "## सामान्य नींद स्वच्छता सुझाव\n\n$tips\n\n"
+            "## वीडियो लिंक्स\n\n$videos\n\n"
+            "---\n\n*तैयार किया गया: $prepared_on* — SleepMitra - Hindi Insomnia Management System\n"
+        ),
+        'plan': Template("## आपकी योजना: $name ($duration_weeks सप्ताह)\n\n$modules\n\n"),
+        'bullet': Template("- $text"),
+        'heading': Template("### $text\n"),
+        'video': Template("$number. [$name]($url)"),
+        'module': Template("- **सप्ताह $week:** $icon $name ($duration) — $required")
+    }
+}
+
+
+def _bullets(templates: Dict[str, Template], items: List[str]) -> str:
+    return '\n'.join(templates['bullet'].substitute(text=item) for item in items)
+
+
+def _render(doc_format: str, assessment: Optional[Dict], plan: Optional[Dict], prepared_on: str) -> str:
+    templates = TEMPLATES[doc_format]
+    videos = '\n'.join(
+        templates['video'].substitute(number=i, name=module['name'], url=module['video_url'])
+        for i, module in enumerate(THERAPY_MODULES, start=1)
+    )
+
+    if not assessment:
+        return templates['general'].substitute(
+            tips=_bullets(templates, GENERAL_TIPS), videos=videos, prepared_on=prepared_on
+        )
+
+    program = '\n\n'.join(
+        templates['heading'].substitute(text=title) + '\n' + _bullets(templates, items)
+        for title, items in WEEKLY_PROGRAM
+    )
+
+    plan_section = ''
+    if plan:
+        module_lines = []
+        for module_plan in plan['modules']:
+            module = get_module(module_plan['id'])
+            if module:
+                module_lines.append(templates['module'].substitute(
+                    week=module_plan['week'], icon=module['icon'], name=module['name'],
+                    duration=module['duration'], required='आवश्यक' if module_plan['required'] else 'वैकल्पिक'
+                ))
+        plan_section = templates['plan'].substitute(
+            name=plan['name'], duration_weeks=plan['duration_weeks'], modules='\n'.join(module_lines)
+        )
+
+    return templates['personal'].substitute(
+        total_score=assessment['total_score'],
+        severity=assessment['severity'],
+        recommendations=_bullets(templates, assessment['recommendations']),
+        plan_section=plan_section,
+        program=program,
+        videos=videos,
+        prepared_on=prepared_on
+    )
+
+
+def document_key(doc_format: str, assessment: Optional[Dict], plan: Optional[Dict], prepared_on: str) -> str:
+    """Content address of a document: hash of every input that affects the output"""
+    inputs = {
+        'format': doc_format,
+        'assessment': {k: assessment[k] for k in ('total_score', 'severity', 'recommendations')} if assessment else None,
+        'plan': {
+            'name': plan['name'],
+            'duration_weeks': plan['duration_weeks'],
+            'modules': [(m['id'], m['week'], m['required']) for m in plan['modules']]
+        } if plan else None,
+        'prepared_on': prepared_on
+    }
+    payload = json.dumps(inputs, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+_documents: "OrderedDict[str, bytes]" = OrderedDict()
+_documents_lock = threading.Lock()
+
+
+def get_plan_document(doc_format: str, assessment: Optional[Dict] = None, plan: Optional[Dict] = None,
+                      prepared_on: Optional[date] = None) -> Tuple[str, bytes]:
+    """Return (content hash, UTF-8 document), rendering only on a cache miss"""
+    prepared_on_text = (prepared_on or date.today()).strftime('%d/%m/%Y')
+    key = document_key(doc_format, assessment, plan, prepared_on_text)
+
+    with _documents_lock:
+        document = _documents.get(key)
+        if document is not None:
+            _documents.move_to_end(key)
+            return key, document
+
+    document = _render(doc_format, assessment, plan, prepared_on_text).encode('utf-8')
+    with _documents_lock:
+        _documents[key] = document
+        if len(_documents) > MAX_CACHED_DOCUMENTS:
+            _documents.popitem(last=False)
+    return key, document
@@ -0,0 +1,84 @@
+"""
+Prompt assembly for the SleepMitra AI assistant
+The persona and instructions form a fixed prefix that is built once and sent
+byte-for-byte identically at the start of every request, so providers can
+cache it. Conversation context follows and is trimmed, oldest first, to a
+local token estimate so every prompt fits a predictable budget.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from conversation_memory import estimate_tokens
+
+Messages = List[Dict[str, str]]
+
+# Estimated prompt tokens per request (prefix + context + question)
+DEFAULT_PROMPT_BUDGET = 1500
+# Role and separator tokens added by the chat format for every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+
+def messages_tokens(messages: Messages) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+
+@dataclass
+class Prompt:
+    messages: Messages
+    prompt_tokens: int
+    context: Messages
+    dropped_messages: int = 0
+
+
+class PromptBuilder:
+    """Stable system prefix + newest context that fits the budget + the question"""
+
+    def __init__(self, system_prompt: str, instructions: str = "", budget_tokens: int = DEFAULT_PROMPT_BUDGET):
+        content = f"{system_prompt}\n\n{instructions}" if instructions else system_prompt
+        self._prefix: Tuple[Tuple[str, str], ...] = (("system", content),)
+        self.prefix_tokens = sum(estimate_tokens(text) + MESSAGE_OVERHEAD_TOKENS for _, text in self._prefix)
+        self.budget_tokens = budget_tokens
+
+    def build(self, question: str, context: Optional[Messages] = None) -> Prompt:
+        question_message = {"role": "user", "content": question}
+        used = self.prefix_tokens + message_tokens(question_message)
+
+        # Keep the newest context messages that fit; the question itself is never trimmed
+        context = context or []
+        start = len(context)
+        while start > 0:
+            cost = message_tokens(context[start - 1])
+            if used + cost > self.budget_tokens:
+                break
+            used += cost
+            start -= 1
+        # Do not open the kept context with an answer whose question was trimmed
+        while start < len(context) and context[start]['role'] == 'assistant':
+            used -= message_tokens(context[start])
+            start += 1
+
+        kept = context[start:]
+        messages = [{"role": role, "content": text} for role, text in self._prefix] + kept + [question_message]
+        return Prompt(messages=messages, prompt_tokens=used, context=kept, dropped_messages=start)
+
+
+_builders: Dict[Tuple[str, str], PromptBuilder] = {}
+_builders_lock = threading.Lock()
+
+
+def get_prompt_builder(system_prompt: str, instructions: str = "") -> PromptBuilder:
+    """Process-wide builder per persona, so its prefix is assembled once and never changes"""
+    key = (system_prompt, instructions)
+    with _builders_lock:
+        builder = _builders.get(key)
+        if builder is None:
+            budget = int(os.getenv("SLEEPMITRA_PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_BUDGET))
+            builder = _builders[key] = PromptBuilder(system_prompt, instructions, budget_tokens=budget)
+        return builder
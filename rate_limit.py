@@ -0,0 +1,146 @@
+"""
+Rate limiting for SleepMitra AI calls
+Token buckets per session and per user, plus a process-wide cap on
+outstanding upstream calls. Admission never blocks: a refused request is
+expected to be answered locally instead.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Defaults: a short burst, then a steady rate
+SESSION_RATE_PER_MINUTE = 6
+SESSION_BURST = 3
+USER_RATE_PER_MINUTE = 20
+USER_BURST = 10
+MAX_OUTSTANDING_CALLS = 8
+
+# Buckets kept in memory per scope (idle buckets are refilled anyway, so dropping them is safe)
+MAX_BUCKETS = 10000
+
+
+class TokenBucket:
+    """Classic token bucket, refilled lazily on access"""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        # now may predate a bucket created after it was read
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+            self.updated_at = now
+
+    def retry_after(self, tokens: float = 1.0) -> float:
+        """Seconds until the given number of tokens is available"""
+        missing = tokens - self.tokens
+        return max(0.0, missing / self.rate_per_second) if self.rate_per_second else float('inf')
+
+
+class Permit:
+    """An admitted request; holds one global slot until released"""
+
+    def __init__(self, limiter: "AIRateLimiter"):
+        self._limiter = limiter
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._limiter._release()
+
+    def __enter__(self) -> "Permit":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class AIRateLimiter:
+    """Per-session and per-user token buckets with a global concurrency cap"""
+
+    def __init__(self, session_rate_per_minute: float = SESSION_RATE_PER_MINUTE, session_burst: float = SESSION_BURST,
+                 user_rate_per_minute: float = USER_RATE_PER_MINUTE, user_burst: float = USER_BURST,
+                 max_outstanding: int = MAX_OUTSTANDING_CALLS):
+        self.limits = {
+            'session': (session_rate_per_minute / 60.0, session_burst),
+            'user': (user_rate_per_minute / 60.0, user_burst)
+        }
+        self.max_outstanding = max_outstanding
+        self.outstanding = 0
+        self.stats: Dict[str, int] = {'admitted': 0, 'session_limited': 0, 'user_limited': 0, 'saturated': 0}
+        self._buckets: Dict[str, "OrderedDict[str, TokenBucket]"] = {scope: OrderedDict() for scope in self.limits}
+        self._lock = threading.Lock()
+
+    def _bucket(self, scope: str, key: str) -> TokenBucket:
+        buckets = self._buckets[scope]
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(*self.limits[scope])
+            buckets[key] = bucket
+            if len(buckets) > MAX_BUCKETS:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+        return bucket
+
+    def try_acquire(self, session_id: str, user_id: Optional[str] = None) -> Optional[Permit]:
+        """A Permit if the request may call upstream now, else None (nothing is consumed on refusal)"""
+        now = time.monotonic()
+        with self._lock:
+            session_bucket = self._bucket('session', session_id)
+            user_bucket = self._bucket('user', user_id or session_id)
+            session_bucket.refill(now)
+            user_bucket.refill(now)
+
+            if session_bucket.tokens < 1:
+                self.stats['session_limited'] += 1
+                return None
+            if user_bucket.tokens < 1:
+                self.stats['user_limited'] += 1
+                return None
+            if self.outstanding >= self.max_outstanding:
+                self.stats['saturated'] += 1
+                return None
+
+            session_bucket.tokens -= 1
+            user_bucket.tokens -= 1
+            self.outstanding += 1
+            self.stats['admitted'] += 1
+            return Permit(self)
+
+    def retry_after(self, session_id: str, user_id: Optional[str] = None) -> float:
+        """Seconds until both buckets allow another request"""
+        now = time.monotonic()
+        with self._lock:
+            buckets = [self._bucket('session', session_id), self._bucket('user', user_id or session_id)]
+            for bucket in buckets:
+                bucket.refill(now)
+            return max(bucket.retry_after() for bucket in buckets)
+
+    def _release(self):
+        with self._lock:
+            self.outstanding -= 1
+
+
+_limiter: Optional[AIRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> AIRateLimiter:
+    """Process-wide limiter shared by every session"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AIRateLimiter(
+                session_rate_per_minute=float(os.getenv("SLEEPMITRA_AI_SESSION_RATE", SESSION_RATE_PER_MINUTE)),
+                user_rate_per_minute=float(os.getenv("SLEEPMITRA_AI_USER_RATE", USER_RATE_PER_MINUTE)),
+                max_outstanding=int(os.getenv("SLEEPMITRA_AI_MAX_OUTSTANDING", MAX_OUTSTANDING_CALLS))
+            )
+        return _limiter
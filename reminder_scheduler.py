@@ -0,0 +1,159 @@
+"""
+Reminder scheduler for SleepMitra
+A process-wide min-heap of reminders keyed on fire time. A background thread
+pops reminders as they become due and queues them per owner (browser session),
+so each rerun only has to collect the reminders that are actually due.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Due reminders kept per owner until the owner's session collects them
+MAX_DUE_PER_OWNER = 100
+# Owners that have not collected their due reminders for this long are assumed gone
+DUE_RETENTION_SECONDS = 24 * 3600
+# Cancelled entries left in the heap before it is compacted
+MIN_STALE_TO_COMPACT = 64
+
+
+class ReminderScheduler:
+    """Min-heap scheduler with a background thread that moves due reminders to per-owner queues"""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str, str, Optional[Dict[str, Any]]]] = []
+        # Sequence number of the live heap entry per pending reminder; heap entries that no longer
+        # match were cancelled or rescheduled and are skipped when they reach the top
+        self._pending: Dict[Tuple[str, str], int] = {}
+        self._stale = 0
+        self._due: Dict[str, Deque[str]] = {}
+        self._due_since: Dict[str, float] = {}
+        self._listeners: List[Callable[[str, str, Optional[Dict[str, Any]]], None]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the background thread (idempotent)"""
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+                self._thread.start()
+
+    def add_listener(self, listener: Callable[[str, str, Optional[Dict[str, Any]]], None]):
+        """Register a callback invoked as listener(owner, reminder_id, payload) whenever a reminder fires"""
+        with self._condition:
+            self._listeners.append(listener)
+
+    def schedule(self, owner: str, reminder_id: str, fire_at: datetime, payload: Optional[Dict[str, Any]] = None):
+        """Schedule a reminder; reminders whose time has already passed fire immediately.
+
+        The optional payload is handed to listeners (e.g. the delivery worker) when the reminder fires.
+        """
+        with self._condition:
+            sequence = next(self._sequence)
+            if self._pending.get((owner, reminder_id)) is not None:
+                # Rescheduled: the earlier entry is now stale
+                self._stale += 1
+            self._pending[(owner, reminder_id)] = sequence
+            heapq.heappush(self._heap, (fire_at.timestamp(), sequence, owner, reminder_id, payload))
+            self._compact()
+            # Wake the worker in case this reminder is now the earliest one
+            self._condition.notify()
+
+    def cancel(self, owner: str, reminder_id: str):
+        """Cancel a reminder that has not fired yet, or drop it from the owner's uncollected due queue"""
+        with self._condition:
+            if self._pending.pop((owner, reminder_id), None) is not None:
+                self._stale += 1
+                self._compact()
+            due = self._due.get(owner)
+            if due and reminder_id in due:
+                due.remove(reminder_id)
+                if not due:
+                    self._forget_due(owner)
+
+    def pop_due(self, owner: str) -> List[str]:
+        """Return and clear the ids of reminders that fired for this owner"""
+        with self._condition:
+            due = self._due.get(owner)
+            self._forget_due(owner)
+        return list(due) if due else []
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def _forget_due(self, owner: str):
+        self._due.pop(owner, None)
+        self._due_since.pop(owner, None)
+
+    def _compact(self):
+        """Rebuild the heap without stale entries once they make up most of it"""
+        if self._stale >= MIN_STALE_TO_COMPACT and self._stale * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if self._pending.get((entry[2], entry[3])) == entry[1]]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def _prune_due(self, now: float):
+        """Drop the due queues of owners whose sessions stopped collecting them"""
+        for owner in [owner for owner, since in self._due_since.items() if now - since > DUE_RETENTION_SECONDS]:
+            self._forget_due(owner)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    # New earlier reminders notify the condition and shorten the wait
+                    self._condition.wait(timeout=delay)
+                    continue
+
+                fired = []
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    _, sequence, owner, reminder_id, payload = heapq.heappop(self._heap)
+                    if self._pending.get((owner, reminder_id)) != sequence:
+                        # Cancelled or rescheduled
+                        self._stale = max(0, self._stale - 1)
+                        continue
+                    del self._pending[(owner, reminder_id)]
+                    if owner not in self._due:
+                        self._due[owner] = deque(maxlen=MAX_DUE_PER_OWNER)
+                        self._due_since[owner] = now
+                    self._due[owner].append(reminder_id)
+                    fired.append((owner, reminder_id, payload))
+                self._prune_due(now)
+                listeners = list(self._listeners)
+
+            for owner, reminder_id, payload in fired:
+                for listener in listeners:
+                    try:
+                        listener(owner, reminder_id, payload)
+                    except Exception:
+                        # A failing listener must not stop the scheduler thread
+                        logger.exception("Reminder listener failed for %s", reminder_id)
+
+
+_scheduler: Optional[ReminderScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_reminder_scheduler() -> ReminderScheduler:
+    """Return the process-wide scheduler, starting it on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ReminderScheduler()
+            _scheduler.start()
+        return _scheduler
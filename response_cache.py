@@ -0,0 +1,155 @@
+"""
+AI response cache for SleepMitra
+Caches LLM answers keyed on the normalized question, the model and a hash of
+the system prompt. A small in-memory LRU tier sits in front of an SQLite file
+shared by every session (and every process on the host), with TTL and
+size-based eviction and hit/miss counters.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from intent_matcher import normalize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "sleepmitra_responses.sqlite3")
+
+# Answers older than this are treated as missing
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+MAX_MEMORY_ENTRIES = 512
+MAX_DISK_ENTRIES = 10000
+
+_TRAILING_PUNCTUATION = re.compile(r'[\s?？!।.,]+$')
+
+
+def normalize_question(question: str) -> str:
+    """Questions differing only in case, spacing, spelling variants or trailing punctuation share an entry"""
+    return _TRAILING_PUNCTUATION.sub('', normalize(question))
+
+
+def cache_key(question: str, model: str, system_prompt: str, context: str = "") -> str:
+    prompt_hash = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()
+    parts = (normalize_question(question), model, prompt_hash, context)
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU over SQLite) cache of LLM responses"""
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_memory_entries: int = MAX_MEMORY_ENTRIES, max_disk_entries: int = MAX_DISK_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.stats: Dict[str, int] = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        try:
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        except sqlite3.Error as e:
+            # The memory tier still works without a writable disk
+            logger.warning("Response cache disk tier unavailable (%s): %s", path, e)
+            self._db = None
+
+    def _remember(self, key: str, response: str, created_at: float):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                response, created_at = cached
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return response
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None and now - row[1] <= self.ttl_seconds:
+                        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._remember(key, row[0], row[1])
+                        self.stats['disk_hits'] += 1
+                        return row[0]
+                    if row is not None:
+                        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self.stats['evictions'] += 1
+                except sqlite3.Error as e:
+                    logger.warning("Response cache read failed: %s", e)
+
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            self.stats['writes'] += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                self._evict(now)
+            except sqlite3.Error as e:
+                logger.warning("Response cache write failed: %s", e)
+
+    def _evict(self, now: float):
+        """Drop expired rows, then the least recently used ones beyond max_disk_entries"""
+        expired = self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        overflow = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            )
+        self.stats['evictions'] += max(expired, 0) + max(overflow, 0)
+
+    def hit_rate(self) -> float:
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache; the file can be moved with SLEEPMITRA_RESPONSE_CACHE_PATH"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                path=os.getenv("SLEEPMITRA_RESPONSE_CACHE_PATH", DEFAULT_PATH),
+                ttl_seconds=float(os.getenv("SLEEPMITRA_RESPONSE_CACHE_TTL", DEFAULT_TTL_SECONDS))
+            )
+        return _cache
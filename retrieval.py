@@ -0,0 +1,116 @@
+"""
+Fuzzy retrieval for the SleepMitra chatbot
+Character n-gram TF-IDF index over knowledge base questions, aliases and
+answers. N-grams make matching tolerant of misspellings and spelling variants,
+and Hinglish (Latin script) phrasings are covered through per-entry aliases.
+Postings are stored as flat numpy arrays (an inverted index in CSC layout), so
+a query only touches the n-grams it contains. Runs fully offline.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from intent_matcher import normalize
+
+NGRAM_SIZES = (2, 3, 4)
+
+# Punctuation is dropped; Devanagari vowel signs and virama are kept
+_NON_WORD = re.compile(r'[^\w\u0900-\u097F]')
+
+# Relative weight of each document field
+FIELD_WEIGHTS = {
+    'question': 2.0,
+    'aliases': 2.0,
+    'answer': 0.5
+}
+
+
+def char_ngrams(text: str, sizes: Sequence[int] = NGRAM_SIZES) -> Counter:
+    """Character n-grams of each normalized word, padded so word boundaries count"""
+    grams: Counter = Counter()
+    for word in normalize(text).split():
+        word = _NON_WORD.sub('', word)
+        if not word:
+            continue
+        padded = f" {word} "
+        for n in sizes:
+            for i in range(max(1, len(padded) - n + 1)):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+class NgramIndex:
+    """Sparse TF-IDF index with cosine scoring over an inverted index"""
+
+    def __init__(self, documents: Sequence[Dict[str, Sequence[str]]]):
+        """documents: one mapping of field name -> texts per document, fields weighted by FIELD_WEIGHTS"""
+        self.size = len(documents)
+
+        term_counts: List[Dict[str, float]] = []
+        document_frequency: Counter = Counter()
+        for document in documents:
+            counts: Dict[str, float] = {}
+            for field, texts in document.items():
+                weight = FIELD_WEIGHTS.get(field, 1.0)
+                for text in texts:
+                    for gram, count in char_ngrams(text).items():
+                        counts[gram] = counts.get(gram, 0.0) + weight * count
+            term_counts.append(counts)
+            document_frequency.update(counts.keys())
+
+        self.vocabulary: Dict[str, int] = {gram: i for i, gram in enumerate(sorted(document_frequency))}
+        self.idf = np.array([
+            math.log((1 + self.size) / (1 + document_frequency[gram])) + 1.0 for gram in sorted(document_frequency)
+        ], dtype=np.float32)
+
+        # Build postings per term, then flatten into indptr / doc ids / weights
+        postings: List[List[Tuple[int, float]]] = [[] for _ in self.vocabulary]
+        for doc_id, counts in enumerate(term_counts):
+            weights = {gram: math.log1p(count) * self.idf[self.vocabulary[gram]] for gram, count in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for gram, weight in weights.items():
+                postings[self.vocabulary[gram]].append((doc_id, weight / norm))
+
+        self.indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(p) for p in postings])
+        self.doc_ids = np.fromiter((d for p in postings for d, _ in p), dtype=np.int32, count=int(self.indptr[-1]))
+        self.weights = np.fromiter((w for p in postings for _, w in p), dtype=np.float32, count=int(self.indptr[-1]))
+
+    def _query_vector(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        counts = char_ngrams(text)
+        terms = np.array([self.vocabulary[g] for g in counts if g in self.vocabulary], dtype=np.int64)
+        if not len(terms):
+            return terms, np.empty(0, dtype=np.float32)
+        tf = np.array([math.log1p(counts[g]) for g in counts if g in self.vocabulary], dtype=np.float32)
+        weights = tf * self.idf[terms]
+        # Normalize over all query n-grams, including unknown ones, so noise lowers confidence
+        unknown = sum(math.log1p(c) ** 2 for g, c in counts.items() if g not in self.vocabulary)
+        norm = math.sqrt(float(np.dot(weights, weights)) + unknown) or 1.0
+        return terms, weights / norm
+
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity of the query against every document"""
+        terms, query_weights = self._query_vector(text)
+        if not len(terms):
+            return np.zeros(self.size, dtype=np.float32)
+
+        starts, ends = self.indptr[terms], self.indptr[terms + 1]
+        lengths = ends - starts
+        # Gather every posting of the query terms in one vectorized step
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        contributions = self.weights[offsets] * np.repeat(query_weights, lengths)
+        return np.bincount(self.doc_ids[offsets], weights=contributions, minlength=self.size).astype(np.float32)
+
+    def search(self, text: str, k: int = 3) -> List[Tuple[int, float]]:
+        """Top-k (document index, confidence) pairs, best first"""
+        scores = self.scores(text)
+        if not self.size:
+            return []
+        k = min(k, self.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
@@ -0,0 +1,139 @@
+"""
+Single-flight request coalescing for SleepMitra
+Concurrent identical requests (same key) share one upstream call: the first
+caller runs it and everyone else waits for its result. Streams are driven by a
+background thread and replayed to every subscriber, so a subscriber leaving
+early does not stall the others. Errors that belong to the leader alone (such as
+its rate limit) are not shared: followers retry with their own call instead.
+Counters record how many calls were coalesced.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Type
+
+# Seconds a follower waits for the leader's result (or the next stream chunk)
+DEFAULT_WAIT_TIMEOUT = 120.0
+
+
+class _Flight:
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.condition = threading.Condition()
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls per key within the process"""
+
+    def __init__(self, wait_timeout: float = DEFAULT_WAIT_TIMEOUT):
+        self.wait_timeout = wait_timeout
+        self.stats: Dict[str, int] = {'calls': 0, 'executions': 0, 'coalesced': 0}
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: Hashable) -> Tuple[_Flight, bool]:
+        """The in-flight call for key and whether the caller is its leader"""
+        with self._lock:
+            self.stats['calls'] += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.stats['coalesced'] += 1
+                return flight, False
+            flight = _Flight()
+            self._flights[key] = flight
+            self.stats['executions'] += 1
+            return flight, True
+
+    def _finish(self, key: Hashable, flight: _Flight, result: Any = None, error: Optional[BaseException] = None):
+        # Later callers start a new flight (and typically hit a cache the leader filled)
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.condition:
+            flight.result = result
+            flight.error = error
+            flight.done = True
+            flight.condition.notify_all()
+
+    def do(self, key: Hashable, fn: Callable[[], Any], retry_on: Tuple[Type[BaseException], ...] = ()) -> Any:
+        """Run fn once for all concurrent callers with the same key.
+
+        retry_on lists errors that are the leader's own; a follower seeing one runs again with its own fn.
+        """
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self._finish(key, flight, error=e)
+                    raise
+                self._finish(key, flight, result=result)
+                return result
+
+            with flight.condition:
+                if not flight.condition.wait_for(lambda: flight.done, self.wait_timeout):
+                    raise TimeoutError(f"Timed out waiting for in-flight request {key!r}")
+            if flight.error is None:
+                return flight.result
+            if not isinstance(flight.error, retry_on):
+                raise flight.error
+
+    def stream(self, key: Hashable, fn: Callable[[], Iterable[Any]],
+               retry_on: Tuple[Type[BaseException], ...] = ()) -> Iterator[Any]:
+        """Iterate fn() once for all concurrent callers; each caller sees every chunk from the start.
+
+        retry_on lists errors that are the leader's own; a follower that sees one before any chunk runs
+        again with its own fn.
+        """
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                threading.Thread(target=self._drive, args=(key, flight, fn), name="single-flight-stream",
+                                 daemon=True).start()
+
+            index = 0
+            while True:
+                with flight.condition:
+                    if not flight.condition.wait_for(lambda: len(flight.chunks) > index or flight.done,
+                                                     self.wait_timeout):
+                        raise TimeoutError(f"Timed out waiting for in-flight stream {key!r}")
+                    new_chunks = flight.chunks[index:]
+                    done = flight.done
+                yield from new_chunks
+                index += len(new_chunks)
+                if done:
+                    break
+            if flight.error is None:
+                return
+            if leader or index > 0 or not isinstance(flight.error, retry_on):
+                raise flight.error
+
+    def _drive(self, key: Hashable, flight: _Flight, fn: Callable[[], Iterable[Any]]):
+        try:
+            for chunk in fn():
+                with flight.condition:
+                    flight.chunks.append(chunk)
+                    flight.condition.notify_all()
+        except BaseException as e:
+            self._finish(key, flight, error=e)
+            return
+        self._finish(key, flight)
+
+    def coalesced_ratio(self) -> float:
+        return self.stats['coalesced'] / self.stats['calls'] if self.stats['calls'] else 0.0
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Process-wide single-flight group shared by every session"""
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
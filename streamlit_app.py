@@ -5,87 +5,200 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import json
-import openai
+import hashlib
+import logging
+import os
+import uuid
 import requests
-from typing import Dict, List, Any
+from typing import Dict, Iterator, List, Optional, Any
+from collections import deque
+from therapy_catalog import THERAPY_MODULES, get_module, get_module_label
+from doctor_directory import DOCTORS, DIRECTORY_VERSION as DOCTOR_DIRECTORY_VERSION
+from therapy_engine import TherapyProgress
+from reminder_scheduler import get_reminder_scheduler
+from notification_delivery import get_delivery_worker, send_booking_confirmation
+from calendar_feed import booking_events, get_calendar_feed, session_events
+from adherence import get_adherence_report, sessions_frame
+from plan_documents import FORMATS as PLAN_DOCUMENT_FORMATS, get_plan_document
+from knowledge_base import get_knowledge_base
+from response_cache import cache_key, get_response_cache
+from llm_backends import backend_setup_hint, backend_unavailable_reason, configured_backend_name, get_llm_backend
+from circuit_breaker import CircuitOpenError
+from answer_router import LLMUnavailable, get_answer_router
+from conversation_memory import ConversationMemory
+from prompt_builder import Prompt, get_prompt_builder
+from single_flight import get_single_flight
+from rate_limit import get_rate_limiter
 
-# AI Voice Assistant Functions
-def get_ai_response(user_message: str) -> str:
-    """Get AI response from OpenAI GPT-4 for Hindi sleep-related queries"""
-    try:
-        # Get API key from secrets (try multiple methods)
-        api_key = None
-        
-        # Method 1: Direct access
-        try:
-            api_key = st.secrets["OPENAI_API_KEY"]
-        except:
-            pass
-        
-        # Method 2: Get method
-        if not api_key:
-            try:
-                api_key = st.secrets.get("OPENAI_API_KEY")
-            except:
-                pass
-        
-        # Method 3: Environment variable fallback
-        if not api_key:
-            import os
-            api_key = os.getenv("OPENAI_API_KEY")
-        
-        if not api_key:
-            # Debug information
-            debug_info = []
-            try:
-                debug_info.append(f"Secrets available: {list(st.secrets.keys())}")
-            except:
-                debug_info.append("No secrets available")
-            
-            try:
-                import os
-                env_keys = [k for k in os.environ.keys() if 'OPENAI' in k]
-                debug_info.append(f"Environment variables: {env_keys}")
-            except:
-                debug_info.append("No environment variables found")
-            
-            return f"❌ OpenAI API key not configured.\n\nDebug info:\n" + "\n".join(debug_info) + "\n\nPlease add OPENAI_API_KEY to Streamlit Cloud secrets."
-        
-        # Initialize OpenAI client
-        client = openai.OpenAI(api_key=api_key)
-        
-        # Create a sleep therapy expert prompt
-        system_prompt = """You are a female Hindi-speaking sleep therapy expert from North India. 
+logger = logging.getLogger(__name__)
+
+# Sleep therapy expert persona
+AI_SYSTEM_PROMPT = """You are a female Hindi-speaking sleep therapy expert from North India. 
         You help patients with sleep problems in Hindi. Speak like a caring, knowledgeable North Indian woman.
         Use North Indian Hindi expressions, be warm and motherly in your tone.
         Always respond in Hindi (Devanagari script). Keep responses concise but informative.
         Use phrases like "बेटा/बेटी", "अरे हां", "देखिए", "समझिए", "अच्छा".
         Focus on CBT-I techniques, sleep hygiene, and when to see a doctor.
         Be empathetic and use North Indian cultural references when appropriate."""
-        
-        # Get response from OpenAI
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            max_tokens=300,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content
-        
+
+# AI Voice Assistant Functions
+def ai_unavailable_message() -> str:
+    """Explain why the AI backend is unavailable: a failed start, missing local model, or a missing OpenAI API key
+    with where we looked"""
+    error = backend_unavailable_reason()
+    if error:
+        return f"❌ AI backend could not be started.\n\nError: {error}"
+    if configured_backend_name() == "local":
+        return f"❌ Local AI model not configured.\n\n{backend_setup_hint()}"
+    
+    debug_info = []
+    try:
+        debug_info.append(f"Secrets available: {list(st.secrets.keys())}")
+    except:
+        debug_info.append("No secrets available")
+    
+    try:
+        import os
+        env_keys = [k for k in os.environ.keys() if 'OPENAI' in k]
+        debug_info.append(f"Environment variables: {env_keys}")
+    except:
+        debug_info.append("No environment variables found")
+    
+    return f"❌ OpenAI API key not configured.\n\nDebug info:\n" + "\n".join(debug_info) + "\n\nPlease add OPENAI_API_KEY to Streamlit Cloud secrets."
+
+def build_ai_prompt(user_message: str, context: Optional[List[Dict[str, str]]] = None) -> Prompt:
+    """Stable persona prefix, prior conversation (from ConversationMemory.context_messages) trimmed to the
+    token budget, and the new question"""
+    return get_prompt_builder(AI_SYSTEM_PROMPT).build(user_message, context)
+
+def get_ai_cache_key(user_message: str, backend_id: str, prompt: Prompt) -> str:
+    # Answers to follow-up questions depend on the conversation actually sent, so it is part of the key
+    context = prompt.context
+    context_hash = hashlib.sha256(json.dumps(context, ensure_ascii=False).encode('utf-8')).hexdigest() if context else ""
+    # Different backends/models answer differently, so their answers are cached separately
+    return cache_key(user_message, backend_id, AI_SYSTEM_PROMPT, context_hash)
+
+# Reverse proxies in front of the app that append to X-Forwarded-For (0 = do not trust the header)
+TRUSTED_PROXY_HOPS = int(os.getenv("SLEEPMITRA_TRUSTED_PROXY_HOPS", "0"))
+
+def get_client_id() -> str:
+    """User identity for rate limiting: the client address recorded by our own proxy, else the session.
+
+    Entries to the left of the ones our proxies appended are supplied by the client and can be forged,
+    so only the hop added by the outermost trusted proxy is used.
+    """
+    if TRUSTED_PROXY_HOPS > 0:
+        # Proxies may append a separate header line instead of extending the existing one
+        forwarded = ",".join(st.context.headers.get_all("X-Forwarded-For"))
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+        # Per-session limits are easy to bypass with new sessions, so make a misconfigured proxy visible
+        logger.warning("X-Forwarded-For has %d of %d trusted hops, rate limiting per session instead",
+                       len(hops), TRUSTED_PROXY_HOPS)
+    return st.session_state.session_uid
+
+def acquire_ai_permit(session_id: str, client_id: str):
+    """Admit an upstream AI call, or raise LLMUnavailable so the router answers from the knowledge base"""
+    permit = get_rate_limiter().try_acquire(session_id, client_id)
+    if permit is None:
+        raise LLMUnavailable("rate_limited")
+    return permit
+
+def get_ai_response(user_message: str, context: Optional[List[Dict[str, str]]] = None) -> str:
+    """Get AI response from the configured LLM backend for Hindi sleep-related queries"""
+    # Shared backend chosen by SLEEPMITRA_LLM_BACKEND (OpenAI, local model or fake)
+    backend = get_llm_backend()
+    if not backend:
+        return ai_unavailable_message()
+    
+    # Repeat questions are answered from the shared cache without an API call
+    response_cache = get_response_cache()
+    prompt = build_ai_prompt(user_message, context)
+    key = get_ai_cache_key(user_message, backend.backend_id, prompt)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    try:
+        session_id, client_id = st.session_state.session_uid, get_client_id()
+        
+        def ask_upstream() -> str:
+            # Only the caller that actually goes upstream is rate limited
+            with acquire_ai_permit(session_id, client_id):
+                answer = backend.complete(prompt.messages, max_tokens=300, temperature=0.7)
+            if answer:
+                response_cache.set(key, answer)
+            return answer
+        
+        # Get response from the AI; identical questions in flight from other sessions wait for that call.
+        # A leader refused by its own rate limit does not refuse them: they retry under their own permit
+        return get_single_flight().do(('complete', key), ask_upstream, retry_on=(LLMUnavailable,))
+        
+    except LLMUnavailable:
+        raise
+    except CircuitOpenError:
+        # Upstream is failing or too slow: answer from the knowledge base without waiting
+        raise LLMUnavailable("circuit_open")
     except Exception as e:
         return f"❌ AI असिस्टेंट में त्रुटि: {str(e)}"
 
+def stream_ai_response(user_message: str, context: Optional[List[Dict[str, str]]] = None) -> Iterator[str]:
+    """Like get_ai_response, but yields the answer as tokens arrive (cached answers arrive in one piece)"""
+    backend = get_llm_backend()
+    if not backend:
+        yield ai_unavailable_message()
+        return
+    
+    response_cache = get_response_cache()
+    prompt = build_ai_prompt(user_message, context)
+    key = get_ai_cache_key(user_message, backend.backend_id, prompt)
+    cached = response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    
+    try:
+        # Read here: the upstream stream runs on a background thread without session state
+        session_id, client_id = st.session_state.session_uid, get_client_id()
+        
+        def stream_upstream() -> Iterator[str]:
+            parts = []
+            with acquire_ai_permit(session_id, client_id):
+                for delta in backend.stream(prompt.messages, max_tokens=300, temperature=0.7):
+                    parts.append(delta)
+                    yield delta
+            answer = "".join(parts)
+            if answer:
+                response_cache.set(key, answer)
+        
+        # Identical questions streaming at the same time share one upstream stream; as above, a rate limit
+        # refusal only applies to the caller it belongs to
+        yield from get_single_flight().stream(('stream', key), stream_upstream, retry_on=(LLMUnavailable,))
+        
+    except LLMUnavailable:
+        raise
+    except CircuitOpenError:
+        # Upstream is failing or too slow: answer from the knowledge base without waiting
+        raise LLMUnavailable("circuit_open")
+    except Exception as e:
+        yield f"❌ AI असिस्टेंट में त्रुटि: {str(e)}"
+
+def answer_question(question: str, context: Optional[List[Dict[str, str]]] = None) -> str:
+    """Answer from the local knowledge base when it is confident, otherwise from the AI"""
+    return get_answer_router().answer(question, lambda q: get_ai_response(q, context)).text
+
+def stream_answer(question: str, context: Optional[List[Dict[str, str]]] = None) -> Iterator[str]:
+    """Streaming variant of answer_question"""
+    return get_answer_router().stream(question, lambda q: stream_ai_response(q, context))
+
 def process_voice_input(transcribed_text: str) -> str:
     """Process voice input and return AI response"""
     if not transcribed_text.strip():
         return "कृपया अपना सवाल स्पष्ट रूप से बोलें।"
     
-    # Get AI response
-    ai_response = get_ai_response(transcribed_text)
+    # Get AI response (knowledge base first)
+    ai_response = answer_question(transcribed_text)
     return ai_response
 
 # Page configuration
@@ -224,203 +337,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Doctor profiles database
-DOCTORS = [
-    {
-        'id': 'dr_rajesh_kumar',
-        'name': 'डॉ. राजेश कुमार',
-        'specialty': 'नींद चिकित्सा विशेषज्ञ',
-        'qualification': 'MD, Sleep Medicine, AIIMS',
-        'experience': '15+ वर्ष',
-        'languages': ['हिंदी', 'English', 'पंजाबी'],
-        'location': 'दिल्ली',
-        'clinic': 'SleepCare Clinic, CP',
-        'rating': 4.8,
-        'patients_treated': 2500,
-        'consultation_fee': 1500,
-        'availability': ['Monday', 'Wednesday', 'Friday'],
-        'time_slots': ['10:00 AM', '2:00 PM', '4:00 PM'],
-        'specialties': ['CBT-I', 'Sleep Apnea', 'Insomnia'],
-        'bio': 'नींद चिकित्सा में 15+ वर्ष का अनुभव। CBT-I और नींद विकारों के विशेषज्ञ।',
-        'image': '👨‍⚕️'
-    },
-    {
-        'id': 'dr_priya_sharma',
-        'name': 'डॉ. प्रिया शर्मा',
-        'specialty': 'मनोचिकित्सक और नींद विशेषज्ञ',
-        'qualification': 'MD Psychiatry, MBBS',
-        'experience': '12+ वर्ष',
-        'languages': ['हिंदी', 'English', 'मराठी'],
-        'location': 'मुंबई',
-        'clinic': 'Mind & Sleep Center, Bandra',
-        'rating': 4.9,
-        'patients_treated': 1800,
-        'consultation_fee': 2000,
-        'availability': ['Tuesday', 'Thursday', 'Saturday'],
-        'time_slots': ['11:00 AM', '3:00 PM', '5:00 PM'],
-        'specialties': ['Anxiety & Sleep', 'Depression & Insomnia', 'CBT-I'],
-        'bio': 'मनोचिकित्सा और नींद विकारों के विशेषज्ञ। चिंता और नींद की समस्याओं में विशेषज्ञता।',
-        'image': '👩‍⚕️'
-    },
-    {
-        'id': 'dr_amit_singh',
-        'name': 'डॉ. अमित सिंह',
-        'specialty': 'नींद चिकित्सा और श्वसन विशेषज्ञ',
-        'qualification': 'MD Pulmonology, Sleep Medicine',
-        'experience': '10+ वर्ष',
-        'languages': ['हिंदी', 'English', 'गुजराती'],
-        'location': 'अहमदाबाद',
-        'clinic': 'Respiratory & Sleep Clinic',
-        'rating': 4.7,
-        'patients_treated': 1200,
-        'consultation_fee': 1200,
-        'availability': ['Monday', 'Wednesday', 'Friday', 'Sunday'],
-        'time_slots': ['9:00 AM', '1:00 PM', '3:00 PM'],
-        'specialties': ['Sleep Apnea', 'Snoring', 'CBT-I'],
-        'bio': 'श्वसन और नींद विकारों के विशेषज्ञ। स्लीप एपनिया और खर्राटों के उपचार में विशेषज्ञता।',
-        'image': '👨‍⚕️'
-    },
-    {
-        'id': 'dr_sunita_reddy',
-        'name': 'डॉ. सुनीता रेड्डी',
-        'specialty': 'नींद चिकित्सा और मनोविज्ञान',
-        'qualification': 'PhD Psychology, Sleep Medicine',
-        'experience': '8+ वर्ष',
-        'languages': ['हिंदी', 'English', 'तेलुगु', 'तमिल'],
-        'location': 'बैंगलोर',
-        'clinic': 'Sleep Psychology Center',
-        'rating': 4.6,
-        'patients_treated': 900,
-        'consultation_fee': 1800,
-        'availability': ['Tuesday', 'Thursday', 'Saturday'],
-        'time_slots': ['10:30 AM', '2:30 PM', '4:30 PM'],
-        'specialties': ['Sleep Psychology', 'CBT-I', 'Relaxation Therapy'],
-        'bio': 'नींद मनोविज्ञान में विशेषज्ञ। CBT-I और रिलैक्सेशन थेरेपी में अनुभवी।',
-        'image': '👩‍⚕️'
-    },
-    {
-        'id': 'dr_vikram_jain',
-        'name': 'डॉ. विक्रम जैन',
-        'specialty': 'नींद चिकित्सा और न्यूरोलॉजी',
-        'qualification': 'MD Neurology, Sleep Medicine',
-        'experience': '18+ वर्ष',
-        'languages': ['हिंदी', 'English', 'राजस्थानी'],
-        'location': 'जयपुर',
-        'clinic': 'Neuro Sleep Center',
-        'rating': 4.9,
-        'patients_treated': 3000,
-        'consultation_fee': 2500,
-        'availability': ['Monday', 'Wednesday', 'Friday'],
-        'time_slots': ['9:30 AM', '1:30 PM', '3:30 PM'],
-        'specialties': ['Neurological Sleep Disorders', 'CBT-I', 'Sleep Studies'],
-        'bio': 'न्यूरोलॉजी और नींद चिकित्सा के वरिष्ठ विशेषज्ञ। जटिल नींद विकारों के उपचार में विशेषज्ञता।',
-        'image': '👨‍⚕️'
-    },
-    {
-        'id': 'dr_meera_patel',
-        'name': 'डॉ. मीरा पटेल',
-        'specialty': 'नींद चिकित्सा और व्यवहार चिकित्सा',
-        'qualification': 'MD, Behavioral Medicine, Sleep Therapy',
-        'experience': '6+ वर्ष',
-        'languages': ['हिंदी', 'English', 'गुजराती'],
-        'location': 'सूरत',
-        'clinic': 'Behavioral Sleep Clinic',
-        'rating': 4.5,
-        'patients_treated': 600,
-        'consultation_fee': 1000,
-        'availability': ['Tuesday', 'Thursday', 'Saturday'],
-        'time_slots': ['11:00 AM', '2:00 PM', '4:00 PM'],
-        'specialties': ['Behavioral Sleep Therapy', 'CBT-I', 'Sleep Hygiene'],
-        'bio': 'व्यवहार चिकित्सा और नींद थेरेपी में विशेषज्ञ। युवा वयस्कों में नींद की समस्याओं के उपचार में अनुभवी।',
-        'image': '👩‍⚕️'
-    }
-]
-
-# Therapy modules data
-THERAPY_MODULES = [
-    {
-        'id': 'cbti_basics',
-        'name': 'CBT-I मूल बातें',
-        'description': 'नींद चिकित्सा की मूल बातें और CBT-I तकनीकों का परिचय',
-        'duration': '30 मिनट',
-        'difficulty': 'शुरुआती',
-        'video_url': 'https://www.youtube.com/watch?v=GyxqKoQAxTk',
-        'icon': '🧠'
-    },
-    {
-        'id': 'sleep_restriction',
-        'name': 'नींद प्रतिबंध तकनीक',
-        'description': 'सोने के समय को नियंत्रित करने की तकनीक',
-        'duration': '25 मिनट',
-        'difficulty': 'मध्यम',
-        'video_url': 'https://www.youtube.com/watch?v=DdtHsaZ_Xp4',
-        'icon': '⏰'
-    },
-    {
-        'id': 'sleep_hygiene',
-        'name': 'नींद स्वच्छता',
-        'description': 'अच्छी नींद के लिए आदतें और वातावरण',
-        'duration': '20 मिनट',
-        'difficulty': 'शुरुआती',
-        'video_url': 'https://www.youtube.com/watch?v=s2dQPI9ZPO0',
-        'icon': '🌙'
-    },
-    {
-        'id': 'progressive_relaxation',
-        'name': 'प्रगतिशील मांसपेशी रिलैक्सेशन',
-        'description': 'शरीर को आराम देने की तकनीक',
-        'duration': '35 मिनट',
-        'difficulty': 'मध्यम',
-        'video_url': 'https://www.youtube.com/watch?v=STPuP0kUnTo',
-        'icon': '🧘‍♀️'
-    },
-    {
-        'id': 'breathing_techniques',
-        'name': 'गहरी सांस लेने की तकनीक',
-        'description': 'तनाव कम करने के लिए सांस लेने के व्यायाम',
-        'duration': '15 मिनट',
-        'difficulty': 'शुरुआती',
-        'video_url': 'https://www.youtube.com/watch?v=kQUae5zodJ8',
-        'icon': '🫁'
-    },
-    {
-        'id': 'bedroom_environment',
-        'name': 'बेडरूम का वातावरण',
-        'description': 'नींद के लिए आदर्श वातावरण बनाना',
-        'duration': '20 मिनट',
-        'difficulty': 'शुरुआती',
-        'video_url': 'https://www.youtube.com/watch?v=dxsR_l5bu7w',
-        'icon': '🏠'
-    },
-    {
-        'id': 'sleep_routine',
-        'name': 'दिनचर्या और नींद',
-        'description': 'नियमित दिनचर्या का महत्व',
-        'duration': '25 मिनट',
-        'difficulty': 'शुरुआती',
-        'video_url': 'https://www.youtube.com/watch?v=KVfDhbFRfy0',
-        'icon': '📅'
-    },
-    {
-        'id': 'cognitive_restructuring',
-        'name': 'संज्ञानात्मक पुनर्गठन',
-        'description': 'नींद के बारे में नकारात्मक विचारों को बदलना',
-        'duration': '40 मिनट',
-        'difficulty': 'उन्नत',
-        'video_url': 'https://www.youtube.com/watch?v=SclJBsQYI_Q',
-        'icon': '💭'
-    },
-    {
-        'id': 'sleep_restriction_therapy',
-        'name': 'नींद प्रतिबंध चिकित्सा',
-        'description': 'नींद की दक्षता बढ़ाने की तकनीक',
-        'duration': '30 मिनट',
-        'difficulty': 'उन्नत',
-        'video_url': 'https://www.youtube.com/watch?v=7okjM6Tq14E',
-        'icon': '🎯'
-    }
-]
-
 # Initialize session state
 if 'diary_entries' not in st.session_state:
     st.session_state.diary_entries = []
@@ -430,12 +346,22 @@ if 'bookings' not in st.session_state:
     st.session_state.bookings = []
 if 'therapy_sessions' not in st.session_state:
     st.session_state.therapy_sessions = []
+if 'therapy_sessions_version' not in st.session_state:
+    st.session_state.therapy_sessions_version = 0
 if 'therapy_reminders' not in st.session_state:
     st.session_state.therapy_reminders = []
+if 'active_reminders' not in st.session_state:
+    st.session_state.active_reminders = []
+if 'session_uid' not in st.session_state:
+    st.session_state.session_uid = uuid.uuid4().hex
 if 'therapy_plan' not in st.session_state:
     st.session_state.therapy_plan = None
 if 'completed_modules' not in st.session_state:
     st.session_state.completed_modules = []
+if 'therapy_progress' not in st.session_state:
+    st.session_state.therapy_progress = None
+    # The plan object therapy_progress was built for
+    st.session_state.therapy_progress_plan = None
 
 # Sample data for demonstration
 def get_sample_diary_data():
@@ -607,136 +533,145 @@ def calculate_isi_score(answers):
         'recommendations': recommendations
     }
 
-def recommend_doctors(assessment_result=None, language_preference="हिंदी", location_preference=None, max_doctors=3):
-    """Recommend doctors based on assessment results, language, and location"""
-    if not assessment_result:
-        # If no assessment, still consider language and location preferences
-        doctor_scores = []
-        
-        for doctor in DOCTORS:
-            score = 0
-            reasons = []
-            
-            # Base score from rating
-            base_score = doctor['rating'] * 10
-            score += base_score
-            reasons.append(f"रेटिंग: {doctor['rating']} ({base_score:.0f} अंक)")
-            
-            # Language preference match
-            if language_preference in doctor['languages']:
-                score += 20
-                reasons.append(f"भाषा मैच: {language_preference} (+20 अंक)")
-            else:
-                reasons.append(f"भाषा मैच नहीं: {language_preference} (0 अंक)")
-            
-            # Location preference match
-            if location_preference and location_preference.lower() in doctor['location'].lower():
-                score += 15
-                reasons.append(f"स्थान मैच: {location_preference} (+15 अंक)")
-            elif location_preference:
-                reasons.append(f"स्थान मैच नहीं: {location_preference} (0 अंक)")
-            
-            # Experience bonus
-            experience_years = int(doctor['experience'].split('+')[0])
-            exp_bonus = experience_years * 2
-            score += exp_bonus
-            reasons.append(f"अनुभव बोनस: {experience_years} वर्ष (+{exp_bonus} अंक)")
-            
-            # Patient count bonus
-            patient_bonus = min(doctor['patients_treated'] / 100, 20)
-            score += patient_bonus
-            reasons.append(f"मरीज अनुभव: {doctor['patients_treated']} मरीज (+{patient_bonus:.0f} अंक)")
-            
-            # Add reasons to doctor data
-            doctor_with_reasons = doctor.copy()
-            doctor_with_reasons['recommendation_score'] = score
-            doctor_with_reasons['recommendation_reasons'] = reasons
-            
-            doctor_scores.append((doctor_with_reasons, score))
-        
-        # Sort by score and return top recommendations
-        doctor_scores.sort(key=lambda x: x[1], reverse=True)
-        return [doctor for doctor, score in doctor_scores[:max_doctors]]
+# Hindi labels for severity-specific score components (used only when explaining a score)
+SCORE_COMPONENT_LABELS = {
+    'cbti': "CBT-I विशेषज्ञता",
+    'senior': "10+ वर्ष अनुभव",
+    'neurological': "न्यूरोलॉजिकल नींद विकार विशेषज्ञता",
+    'sleep_psychology': "नींद मनोविज्ञान विशेषज्ञता",
+    'sleep_hygiene': "नींद स्वच्छता विशेषज्ञता",
+    'behavioral': "व्यवहार नींद चिकित्सा"
+}
+
+def score_doctor(doctor, severity=None, language_preference="हिंदी", location_preference=None):
+    """Score a doctor and return the numeric score components (no display strings)"""
+    experience_years = int(doctor['experience'].split('+')[0])
+    
+    components = {
+        'rating': doctor['rating'] * 10,
+        'language': 20 if language_preference in doctor['languages'] else 0,
+        'experience': experience_years * 2,
+        # More patients = more experience
+        'patients': min(doctor['patients_treated'] / 100, 20)
+    }
     
-    severity = assessment_result.get('severity', 'हल्का')
-    total_score = assessment_result.get('total_score', 0)
+    # Location preference match
+    if location_preference:
+        components['location'] = 15 if location_preference.lower() in doctor['location'].lower() else 0
+    
+    # Severity-based specialty matching (only when an assessment is available)
+    if severity == 'गंभीर':
+        # For severe cases, prefer experienced doctors with specific specialties
+        if 'CBT-I' in doctor['specialties']:
+            components['cbti'] = 25
+        if experience_years >= 10:
+            components['senior'] = 15
+        if 'Neurological Sleep Disorders' in doctor['specialties']:
+            components['neurological'] = 20
+    elif severity == 'मध्यम':
+        # For moderate cases, prefer CBT-I specialists
+        if 'CBT-I' in doctor['specialties']:
+            components['cbti'] = 20
+        if 'Sleep Psychology' in doctor['specialties']:
+            components['sleep_psychology'] = 15
+    elif severity:
+        # For mild cases, prefer general sleep specialists
+        if 'Sleep Hygiene' in doctor['specialties']:
+            components['sleep_hygiene'] = 15
+        if 'Behavioral Sleep Therapy' in doctor['specialties']:
+            components['behavioral'] = 10
+    
+    return components
+
+def explain_recommendation(doctor, language_preference="हिंदी", location_preference=None):
+    """Build the human-readable (Hindi) breakdown of a recommendation score on demand"""
+    components = doctor.get('recommendation_components', {})
+    reasons = [f"रेटिंग: {doctor['rating']} ({components.get('rating', 0):.0f} अंक)"]
     
-    # Scoring system for doctor recommendations
-    doctor_scores = []
+    if components.get('language'):
+        reasons.append(f"भाषा मैच: {language_preference} (+{components['language']} अंक)")
+    else:
+        reasons.append(f"भाषा मैच नहीं: {language_preference} (0 अंक)")
     
-    for doctor in DOCTORS:
-        score = 0
-        reasons = []
-        
-        # Base score from rating
-        base_score = doctor['rating'] * 10
-        score += base_score
-        reasons.append(f"रेटिंग: {doctor['rating']} ({base_score:.0f} अंक)")
-        
-        # Language preference match
-        if language_preference in doctor['languages']:
-            score += 20
-            reasons.append(f"भाषा मैच: {language_preference} (+20 अंक)")
+    if location_preference:
+        if components.get('location'):
+            reasons.append(f"स्थान मैच: {location_preference} (+{components['location']} अंक)")
         else:
-            reasons.append(f"भाषा मैच नहीं: {language_preference} (0 अंक)")
-        
-        # Location preference match
-        if location_preference and location_preference.lower() in doctor['location'].lower():
-            score += 15
-            reasons.append(f"स्थान मैच: {location_preference} (+15 अंक)")
-        elif location_preference:
             reasons.append(f"स्थान मैच नहीं: {location_preference} (0 अंक)")
-        
-        # Severity-based specialty matching
-        if severity in ['गंभीर']:
-            # For severe cases, prefer experienced doctors with specific specialties
-            if 'CBT-I' in doctor['specialties']:
-                score += 25
-                reasons.append("CBT-I विशेषज्ञता (+25 अंक)")
-            if int(doctor['experience'].split('+')[0]) >= 10:
-                score += 15
-                reasons.append("10+ वर्ष अनुभव (+15 अंक)")
-            if 'Neurological Sleep Disorders' in doctor['specialties']:
-                score += 20
-                reasons.append("न्यूरोलॉजिकल नींद विकार विशेषज्ञता (+20 अंक)")
-        elif severity == 'मध्यम':
-            # For moderate cases, prefer CBT-I specialists
-            if 'CBT-I' in doctor['specialties']:
-                score += 20
-                reasons.append("CBT-I विशेषज्ञता (+20 अंक)")
-            if 'Sleep Psychology' in doctor['specialties']:
-                score += 15
-                reasons.append("नींद मनोविज्ञान विशेषज्ञता (+15 अंक)")
-        else:
-            # For mild cases, prefer general sleep specialists
-            if 'Sleep Hygiene' in doctor['specialties']:
-                score += 15
-                reasons.append("नींद स्वच्छता विशेषज्ञता (+15 अंक)")
-            if 'Behavioral Sleep Therapy' in doctor['specialties']:
-                score += 10
-                reasons.append("व्यवहार नींद चिकित्सा (+10 अंक)")
-        
-        # Experience bonus
-        experience_years = int(doctor['experience'].split('+')[0])
-        exp_bonus = experience_years * 2
-        score += exp_bonus
-        reasons.append(f"अनुभव बोनस: {experience_years} वर्ष (+{exp_bonus} अंक)")
-        
-        # Patient count bonus (more patients = more experience)
-        patient_bonus = min(doctor['patients_treated'] / 100, 20)
-        score += patient_bonus
-        reasons.append(f"मरीज अनुभव: {doctor['patients_treated']} मरीज (+{patient_bonus:.0f} अंक)")
-        
-        # Add reasons to doctor data
-        doctor_with_reasons = doctor.copy()
-        doctor_with_reasons['recommendation_score'] = score
-        doctor_with_reasons['recommendation_reasons'] = reasons
-        
-        doctor_scores.append((doctor_with_reasons, score))
+    
+    for key, label in SCORE_COMPONENT_LABELS.items():
+        if key in components:
+            reasons.append(f"{label} (+{components[key]} अंक)")
+    
+    experience_years = int(doctor['experience'].split('+')[0])
+    reasons.append(f"अनुभव बोनस: {experience_years} वर्ष (+{components.get('experience', 0)} अंक)")
+    reasons.append(f"मरीज अनुभव: {doctor['patients_treated']} मरीज (+{components.get('patients', 0):.0f} अंक)")
+    
+    return reasons
+
+def recommend_doctors(assessment_result=None, language_preference="हिंदी", location_preference=None, max_doctors=3):
+    """Recommend doctors based on assessment results, language, and location"""
+    # Without an assessment only language and location preferences are considered
+    severity = assessment_result.get('severity', 'हल्का') if assessment_result else None
+    
+    doctor_scores = []
+    for doctor in DOCTORS:
+        components = score_doctor(doctor, severity, language_preference, location_preference)
+        doctor_scores.append((doctor, sum(components.values()), components))
     
     # Sort by score and return top recommendations
     doctor_scores.sort(key=lambda x: x[1], reverse=True)
-    return [doctor for doctor, score in doctor_scores[:max_doctors]]
+    
+    recommendations = []
+    for doctor, score, components in doctor_scores[:max_doctors]:
+        recommended = doctor.copy()
+        recommended['recommendation_score'] = score
+        recommended['recommendation_components'] = components
+        recommendations.append(recommended)
+    return recommendations
+
+def get_doctor_directory_version():
+    """Content hash of the doctor directory, used to invalidate cached recommendations"""
+    return DOCTOR_DIRECTORY_VERSION
+
+def get_isi_score_band(total_score):
+    """Map an ISI total score to its severity band (same cut-offs as calculate_isi_score)"""
+    if total_score <= 7:
+        return 0
+    if total_score <= 14:
+        return 1
+    return 2
+
+@st.cache_resource(max_entries=256, ttl=3600, show_spinner=False)
+def _cached_recommendations(severity, score_band, language_preference, location_preference, max_doctors, directory_version):
+    """Process-wide LRU/TTL cache of recommend_doctors results, shared across sessions"""
+    assessment_result = {'severity': severity} if severity else None
+    return tuple(recommend_doctors(
+        assessment_result=assessment_result,
+        language_preference=language_preference,
+        location_preference=location_preference,
+        max_doctors=max_doctors
+    ))
+
+def get_recommended_doctors(assessment_result=None, language_preference="हिंदी", location_preference=None, max_doctors=3):
+    """Memoized recommend_doctors keyed on the preference tuple and directory version.
+
+    The returned doctor dicts are shared between sessions and must be treated as read-only.
+    """
+    severity = None
+    score_band = None
+    if assessment_result:
+        severity = assessment_result.get('severity', 'हल्का')
+        score_band = get_isi_score_band(assessment_result.get('total_score', 0))
+    
+    return _cached_recommendations(
+        severity,
+        score_band,
+        language_preference,
+        location_preference,
+        max_doctors,
+        get_doctor_directory_version()
+    )
 
 def create_therapy_plan(assessment_result):
     """Create a personalized therapy plan based on assessment results"""
@@ -795,51 +730,53 @@ def create_therapy_plan(assessment_result):
     return plan
 
 def update_module_unlock_status():
-    """Update which modules are unlocked based on completed modules"""
-    if not st.session_state.therapy_plan:
-        return
-    
-    # Reset all modules to locked except the first one
-    for module in st.session_state.therapy_plan['modules']:
-        module['unlocked'] = False
-    
-    # Unlock the first module
-    if st.session_state.therapy_plan['modules']:
-        st.session_state.therapy_plan['modules'][0]['unlocked'] = True
-    
-    # Unlock modules based on completion
-    completed_ids = [m['id'] for m in st.session_state.completed_modules]
-    
-    for i, module in enumerate(st.session_state.therapy_plan['modules']):
-        if module['id'] in completed_ids:
-            # Unlock the next module if this one is completed
-            if i + 1 < len(st.session_state.therapy_plan['modules']):
-                st.session_state.therapy_plan['modules'][i + 1]['unlocked'] = True
+    """Build the progression engine for the current plan once; later completions update it incrementally"""
+    plan = st.session_state.therapy_plan
+    if not plan:
+        st.session_state.therapy_progress = None
+        st.session_state.therapy_progress_plan = None
+        return None
+    
+    progress = st.session_state.therapy_progress
+    # Rebuild for every new plan, even one with the same module ids
+    if progress is None or st.session_state.get('therapy_progress_plan') is not plan:
+        completed_ids = [m['id'] for m in st.session_state.completed_modules]
+        progress = TherapyProgress(plan['modules'], completed_ids)
+        st.session_state.therapy_progress = progress
+        st.session_state.therapy_progress_plan = plan
+    return progress
 
-def check_and_show_reminders():
-    """Check for active reminders and show them"""
-    current_time = datetime.now()
-    active_reminders = []
-    
+def cancel_session_reminders(session_id):
+    """Withdraw reminders that have not fired yet for a therapy session that is cancelled or already held"""
+    scheduler = get_reminder_scheduler()
     for reminder in st.session_state.therapy_reminders:
-        if reminder['status'] == 'pending':
-            reminder_time = datetime.fromisoformat(reminder['reminder_datetime'])
-            # Show reminder if it's time (within 5 minutes of reminder time)
-            if abs((current_time - reminder_time).total_seconds()) <= 300:  # 5 minutes
-                active_reminders.append(reminder)
-    
-    if active_reminders:
-        for reminder in active_reminders:
-            st.warning(f"🔔 **रिमाइंडर:** {reminder['message']}")
-            col1, col2 = st.columns([1, 4])
-            with col1:
-                if st.button("✅ देख लिया", key=f"dismiss_{reminder['id']}"):
-                    reminder['status'] = 'dismissed'
-                    st.rerun()
-            with col2:
-                if st.button("📅 चिकित्सा पेज पर जाएं", key=f"goto_therapy_{reminder['id']}"):
-                    st.session_state.current_page = "चिकित्सा"
-                    st.rerun()
+        if reminder['session_id'] == session_id and reminder['status'] == 'pending':
+            scheduler.cancel(st.session_state.session_uid, reminder['id'])
+            reminder['status'] = 'cancelled'
+
+def check_and_show_reminders():
+    """Collect reminders fired by the background scheduler and show them until dismissed"""
+    due_ids = get_reminder_scheduler().pop_due(st.session_state.session_uid)
+    if due_ids:
+        reminders_by_id = {r['id']: r for r in st.session_state.therapy_reminders}
+        for reminder_id in due_ids:
+            reminder = reminders_by_id.get(reminder_id)
+            if reminder and reminder['status'] == 'pending':
+                reminder['status'] = 'sent'
+                st.session_state.active_reminders.append(reminder)
+    
+    for reminder in list(st.session_state.active_reminders):
+        st.warning(f"🔔 **रिमाइंडर:** {reminder['message']}")
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            if st.button("✅ देख लिया", key=f"dismiss_{reminder['id']}"):
+                reminder['status'] = 'dismissed'
+                st.session_state.active_reminders.remove(reminder)
+                st.rerun()
+        with col2:
+            if st.button("📅 चिकित्सा पेज पर जाएं", key=f"goto_therapy_{reminder['id']}"):
+                st.session_state.current_page = "चिकित्सा"
+                st.rerun()
 
 def main():
     # Check and show active reminders
@@ -1152,8 +1089,8 @@ def show_booking():
     if last_assessment:
         st.info(f"📊 आपके आकलन परिणाम (ISI स्कोर: {last_assessment['total_score']}, गंभीरता: {last_assessment['severity']}) के आधार पर डॉक्टरों की सिफारिश की जा रही है।")
     
-    # Get recommended doctors - this will recalculate when preferences change
-    recommended_doctors = recommend_doctors(
+    # Get recommended doctors - cached per preference tuple, recalculated when preferences change
+    recommended_doctors = get_recommended_doctors(
         assessment_result=last_assessment,
         language_preference=language_preference,
         location_preference=location_preference,
@@ -1168,10 +1105,6 @@ def show_booking():
     st.subheader("🎯 आपके लिए अनुशंसित डॉक्टर")
     
     for i, doctor in enumerate(recommended_doctors):
-        # Show recommendation score and reasons
-        score = doctor.get('recommendation_score', 0)
-        reasons = doctor.get('recommendation_reasons', [])
-        
         with st.expander(f"{doctor['image']} {doctor['name']} - {doctor['specialty']} ⭐ {doctor['rating']}", expanded=(i==0)):
             col1, col2 = st.columns([1, 2])
             
@@ -1206,6 +1139,12 @@ def show_booking():
                     with availability_cols[j]:
                         st.markdown(f"📅 {day}")
                 
+                # Score breakdown is only formatted when the user asks for it
+                if st.checkbox("🔍 सिफारिश का कारण देखें", key=f"why_{doctor['id']}"):
+                    st.markdown(f"**सिफारिश स्कोर:** {doctor['recommendation_score']:.0f} अंक")
+                    for reason in explain_recommendation(doctor, language_preference, location_preference):
+                        st.markdown(f"• {reason}")
+                
                 # Booking button for this doctor
                 if st.button(f"📅 {doctor['name']} के साथ अपॉइंटमेंट बुक करें", key=f"book_{doctor['id']}", use_container_width=True):
                     st.session_state.selected_doctor = doctor
@@ -1302,6 +1241,7 @@ def show_booking():
                 
                 patient_name = st.text_input("आपका नाम")
                 patient_phone = st.text_input("फोन नंबर")
+                patient_email = st.text_input("ईमेल (वैकल्पिक)")
             
             reason = st.text_area("समस्या का विवरण", placeholder="अपनी नींद की समस्या के बारे में बताएं...")
             
@@ -1317,12 +1257,16 @@ def show_booking():
                         'type': appointment_type,
                         'patient_name': patient_name,
                         'patient_phone': patient_phone,
+                        'patient_email': patient_email,
                         'reason': reason,
                         'consultation_fee': doctor['consultation_fee'],
+                        'clinic': doctor['clinic'],
                         'timestamp': datetime.now().isoformat()
                     }
                     
                     st.session_state.bookings.append(booking)
+                    # SMS/e-mail confirmation goes out in the background delivery worker
+                    send_booking_confirmation(st.session_state.session_uid, booking)
                     st.success(f"🎉 {doctor['name']} के साथ आपकी अपॉइंटमेंट सफलतापूर्वक बुक हो गई है!")
                     st.session_state.selected_doctor = None
                     st.rerun()
@@ -1453,6 +1397,47 @@ def show_analytics():
                 <p>रात में जागने की संख्या को कम करने के लिए नियमित दिनचर्या बनाए रखें।</p>
             </div>
             """, unsafe_allow_html=True)
+    
+    # Therapy adherence
+    if st.session_state.therapy_sessions:
+        st.subheader("🧠 चिकित्सा सत्रों का पालन")
+        
+        if st.session_state.therapy_plan:
+            module_order = [m['id'] for m in st.session_state.therapy_plan['modules']]
+        else:
+            module_order = [m['id'] for m in THERAPY_MODULES]
+        
+        # Cached per sessions version - only recomputed after a session is scheduled, completed or missed
+        report = get_adherence_report(
+            (st.session_state.session_uid, st.session_state.therapy_sessions_version),
+            lambda: sessions_frame(st.session_state.therapy_sessions, st.session_state.session_uid),
+            module_order
+        )
+        patient = report['patients'].iloc[0]
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            rate = patient['completion_rate']
+            st.metric("पूर्णता दर", "—" if pd.isna(rate) else f"{rate * 100:.0f}%")
+        with col2:
+            st.metric("वर्तमान लगातार सत्र", int(patient['current_streak']))
+        with col3:
+            st.metric("सबसे लंबा सिलसिला", int(patient['longest_streak']))
+        with col4:
+            delay = patient['avg_delay_minutes']
+            st.metric("औसत देरी", "—" if pd.isna(delay) else f"{delay:.0f} मिनट")
+        
+        funnel = report['funnel'].reset_index()
+        funnel['module_name'] = [get_module(module_id)['name'] for module_id in funnel['module_id']]
+        fig_funnel = px.funnel(
+            funnel,
+            x='patients',
+            y='module_name',
+            title='मॉड्यूल पूर्णता फ़नल',
+            labels={'patients': 'पूर्ण सत्र', 'module_name': 'मॉड्यूल'}
+        )
+        fig_funnel.update_layout(font_family="Noto Sans Devanagari")
+        st.plotly_chart(fig_funnel, use_container_width=True)
 
 def show_therapy():
     st.markdown("### 🧠 चिकित्सा सुझाव")
@@ -1469,8 +1454,7 @@ def show_therapy():
         st.success(f"🎯 आपके लिए व्यक्तिगत चिकित्सा योजना बनाई गई है: **{st.session_state.therapy_plan['name']}**")
     
     # Update module unlock status
-    if st.session_state.therapy_plan:
-        update_module_unlock_status()
+    therapy_progress = update_module_unlock_status()
     
     # Display therapy plan
     if st.session_state.therapy_plan:
@@ -1498,12 +1482,12 @@ def show_therapy():
         
         for i, module_plan in enumerate(plan['modules']):
             # Find the actual module data
-            module_data = next((m for m in THERAPY_MODULES if m['id'] == module_plan['id']), None)
+            module_data = get_module(module_plan['id'])
             if not module_data:
                 continue
             
-            is_completed = module_plan['id'] in [m['id'] for m in st.session_state.completed_modules]
-            is_unlocked = module_plan['unlocked']
+            is_completed = therapy_progress.is_completed(module_plan['id'])
+            is_unlocked = therapy_progress.is_unlocked(module_plan['id'])
             
             # Determine styling based on status
             if is_completed:
@@ -1556,6 +1540,7 @@ def show_therapy():
                                 'week': module_plan['week']
                             }
                             st.session_state.completed_modules.append(completed_module)
+                            therapy_progress.complete(module_plan['id'])
                             st.success(f"✅ {module_data['name']} पूर्ण हो गया!")
                             st.rerun()
                     else:
@@ -1565,7 +1550,7 @@ def show_therapy():
                     if is_unlocked and not is_completed:
                         if st.button("📅 शेड्यूल", key=f"schedule_module_{module_plan['id']}", use_container_width=True):
                             # Pre-fill the scheduling form with this module
-                            st.session_state.selected_module_for_scheduling = module_data
+                            st.session_state.selected_module_for_scheduling = module_plan['id']
                             st.rerun()
     
     elif last_assessment:
@@ -1592,35 +1577,31 @@ def show_therapy():
             with col2:
                 # Therapy module selection - only show unlocked modules from therapy plan
                 if st.session_state.therapy_plan:
-                    # Get unlocked modules from therapy plan
-                    unlocked_modules = []
-                    for module_plan in st.session_state.therapy_plan['modules']:
-                        if module_plan['unlocked']:
-                            module_data = next((m for m in THERAPY_MODULES if m['id'] == module_plan['id']), None)
-                            if module_data:
-                                unlocked_modules.append(module_data)
+                    # Get unlocked module ids from therapy plan
+                    unlocked_module_ids = [
+                        module_plan['id'] for module_plan in st.session_state.therapy_plan['modules']
+                        if therapy_progress.is_unlocked(module_plan['id']) and get_module(module_plan['id'])
+                    ]
                     
-                    if unlocked_modules:
-                        module_options = {f"{module['icon']} {module['name']} ({module['duration']})": module for module in unlocked_modules}
+                    if unlocked_module_ids:
                         # Pre-select if a module was selected from the therapy plan
                         default_index = 0
                         if hasattr(st.session_state, 'selected_module_for_scheduling'):
-                            selected_module_name = f"{st.session_state.selected_module_for_scheduling['icon']} {st.session_state.selected_module_for_scheduling['name']} ({st.session_state.selected_module_for_scheduling['duration']})"
-                            if selected_module_name in module_options:
-                                default_index = list(module_options.keys()).index(selected_module_name)
+                            if st.session_state.selected_module_for_scheduling in unlocked_module_ids:
+                                default_index = unlocked_module_ids.index(st.session_state.selected_module_for_scheduling)
                             # Clear the selected module after using it
                             delattr(st.session_state, 'selected_module_for_scheduling')
                         
-                        selected_module_name = st.selectbox("चिकित्सा मॉड्यूल चुनें (केवल उपलब्ध)", list(module_options.keys()), index=default_index, key="therapy_module")
-                        selected_module = module_options[selected_module_name]
+                        selected_module_id = st.selectbox("चिकित्सा मॉड्यूल चुनें (केवल उपलब्ध)", unlocked_module_ids, index=default_index, format_func=get_module_label, key="therapy_module")
+                        selected_module = get_module(selected_module_id)
                     else:
                         st.warning("कोई मॉड्यूल उपलब्ध नहीं है। पहले पिछले मॉड्यूल पूर्ण करें।")
                         selected_module = None
                 else:
                     # Fallback to all modules if no therapy plan
-                    module_options = {f"{module['icon']} {module['name']} ({module['duration']})": module for module in THERAPY_MODULES}
-                    selected_module_name = st.selectbox("चिकित्सा मॉड्यूल चुनें", list(module_options.keys()), key="therapy_module")
-                    selected_module = module_options[selected_module_name]
+                    all_module_ids = [module['id'] for module in THERAPY_MODULES]
+                    selected_module_id = st.selectbox("चिकित्सा मॉड्यूल चुनें", all_module_ids, format_func=get_module_label, key="therapy_module")
+                    selected_module = get_module(selected_module_id)
                 
                 # Reminder options
                 reminder_options = ["15 मिनट पहले", "30 मिनट पहले", "1 घंटा पहले", "2 घंटे पहले", "1 दिन पहले"]
@@ -1628,6 +1609,12 @@ def show_therapy():
             
             session_notes = st.text_area("नोट्स (वैकल्पिक)", placeholder="इस सत्र के लिए कोई विशेष नोट्स...", key="session_notes")
             
+            contact_col1, contact_col2 = st.columns(2)
+            with contact_col1:
+                reminder_phone = st.text_input("📱 फोन नंबर (SMS रिमाइंडर, वैकल्पिक)", key="reminder_phone")
+            with contact_col2:
+                reminder_email = st.text_input("📧 ईमेल (ईमेल रिमाइंडर, वैकल्पिक)", key="reminder_email")
+            
             col1, col2 = st.columns(2)
             with col1:
                 if st.form_submit_button("📅 सत्र शेड्यूल करें", use_container_width=True):
@@ -1642,7 +1629,7 @@ def show_therapy():
                             'date': session_date.strftime('%Y-%m-%d'),
                             'time': session_time.strftime('%H:%M'),
                             'datetime': session_datetime.isoformat(),
-                            'module': selected_module,
+                            'module_id': selected_module['id'],
                             'reminder_time': reminder_time,
                             'notes': session_notes,
                             'status': 'scheduled',  # scheduled, completed, missed
@@ -1650,6 +1637,7 @@ def show_therapy():
                         }
                         
                         st.session_state.therapy_sessions.append(therapy_session)
+                        st.session_state.therapy_sessions_version += 1
                         
                         # Create reminder
                         reminder_datetime = session_datetime
@@ -1669,11 +1657,22 @@ def show_therapy():
                             'session_id': therapy_session['id'],
                             'reminder_datetime': reminder_datetime.isoformat(),
                             'message': f"🔔 आपका चिकित्सा सत्र {selected_module['name']} {session_date.strftime('%d/%m/%Y')} को {session_time.strftime('%H:%M')} बजे शुरू होने वाला है।",
-                            'status': 'pending'  # pending, sent, dismissed
+                            'phone': reminder_phone,
+                            'email': reminder_email,
+                            'status': 'pending'  # pending, sent, dismissed, cancelled
                         }
                         
                         st.session_state.therapy_reminders.append(reminder)
                         
+                        # Subscribe the delivery worker before the reminder can fire
+                        get_delivery_worker()
+                        get_reminder_scheduler().schedule(
+                            st.session_state.session_uid,
+                            reminder['id'],
+                            reminder_datetime,
+                            payload={'message': reminder['message'], 'phone': reminder_phone, 'email': reminder_email}
+                        )
+                        
                         st.success(f"🎉 आपका चिकित्सा सत्र {selected_module['name']} {session_date.strftime('%d/%m/%Y')} को {session_time.strftime('%H:%M')} बजे शेड्यूल हो गया है!")
                         st.rerun()
             
@@ -1693,7 +1692,7 @@ def show_therapy():
             st.markdown("**🕐 आगामी सत्र:**")
             for session in sorted(scheduled_sessions, key=lambda x: x['datetime']):
                 session_datetime = datetime.fromisoformat(session['datetime'])
-                module = session['module']
+                module = get_module(session['module_id'])
                 
                 with st.container():
                     col1, col2, col3 = st.columns([3, 1, 1])
@@ -1713,7 +1712,9 @@ def show_therapy():
                         if st.button("▶️ शुरू करें", key=f"start_{session['id']}", use_container_width=True):
                             # Mark session as completed
                             session['status'] = 'completed'
+                            st.session_state.therapy_sessions_version += 1
                             session['completed_at'] = datetime.now().isoformat()
+                            cancel_session_reminders(session['id'])
                             st.success("✅ सत्र पूर्ण हो गया!")
                             st.rerun()
                     
@@ -1721,14 +1722,17 @@ def show_therapy():
                         if st.button("❌ रद्द करें", key=f"cancel_{session['id']}", use_container_width=True):
                             # Mark session as missed
                             session['status'] = 'missed'
+                            st.session_state.therapy_sessions_version += 1
                             session['cancelled_at'] = datetime.now().isoformat()
+                            # Otherwise the reminder would still fire (and be delivered by SMS/e-mail)
+                            cancel_session_reminders(session['id'])
                             st.warning("❌ सत्र रद्द हो गया!")
                             st.rerun()
         
         if completed_sessions:
             st.markdown("**✅ पूर्ण सत्र:**")
             for session in sorted(completed_sessions, key=lambda x: x.get('completed_at', ''), reverse=True)[:3]:
-                module = session['module']
+                module = get_module(session['module_id'])
                 st.markdown(f"""
                 <div style="background: #e8f5e8; padding: 0.8rem; border-radius: 6px; margin-bottom: 0.5rem; border-left: 4px solid #28a745;">
                     <strong>{module['icon']} {module['name']}</strong> - {session['date']} {session['time']} ✅
@@ -1743,6 +1747,22 @@ def show_therapy():
             reminder_datetime = datetime.fromisoformat(reminder['reminder_datetime'])
             st.info(f"📅 {reminder_datetime.strftime('%d/%m/%Y %H:%M')}: {reminder['message']}")
     
+    # Calendar export - the feed only re-renders events that changed since the last rerun
+    if st.session_state.therapy_sessions or st.session_state.bookings:
+        feed = get_calendar_feed(st.session_state.session_uid)
+        feed.update(
+            session_events(st.session_state.therapy_sessions, get_module)
+            + booking_events(st.session_state.bookings)
+        )
+        st.download_button(
+            label="📆 सत्र और अपॉइंटमेंट कैलेंडर में जोड़ें (.ics)",
+            data=feed.render(),
+            file_name="sleepmitra-calendar.ics",
+            mime="text/calendar",
+            use_container_width=True,
+            key="download_calendar_feed"
+        )
+    
     st.markdown("---")
     
     # Get last assessment result
@@ -1877,150 +1897,52 @@ def show_therapy():
     st.subheader("📥 चिकित्सा योजना डाउनलोड करें")
     
     if st.button("📄 व्यक्तिगत चिकित्सा योजना डाउनलोड करें", use_container_width=True, key="download_therapy_plan"):
-        if last_assessment:
-            therapy_plan = f"""नींद साथी - व्यक्तिगत चिकित्सा योजना
-
-आकलन परिणाम:
-- ISI स्कोर: {last_assessment['total_score']}
-- गंभीरता: {last_assessment['severity']}
-
-अनुशंसित चिकित्सा:
-{chr(10).join([f"• {rec}" for rec in last_assessment['recommendations']])}
-
-चिकित्सा कार्यक्रम:
-सप्ताह 1: नींद स्वच्छता
-• नियमित सोने का समय निर्धारित करें
-• बेडरूम को ठंडा और अंधेरा रखें
-• सोने से 1 घंटे पहले स्क्रीन से दूर रहें
-• कैफीन का सेवन कम करें
-
-सप्ताह 2: रिलैक्सेशन तकनीकें
-• प्रगतिशील मांसपेशी रिलैक्सेशन सीखें
-• गहरी सांस लेने की तकनीक अभ्यास करें
-• मेडिटेशन शुरू करें
-• सोने से पहले रिलैक्सेशन रूटीन बनाएं
-
-सप्ताह 3-4: CBT-I तकनीकें
-• नींद प्रतिबंध तकनीक सीखें
-• संज्ञानात्मक पुनर्गठन अभ्यास करें
-• नींद डायरी रखना जारी रखें
-• प्रगति का मूल्यांकन करें
-
-वीडियो लिंक्स:
-1. CBT-I का परिचय: https://www.youtube.com/watch?v=GyxqKoQAxTk
-2. नींद प्रतिबंध तकनीक: https://www.youtube.com/watch?v=DdtHsaZ_Xp4
-3. नींद स्वच्छता: https://www.youtube.com/watch?v=s2dQPI9ZPO0
-4. प्रगतिशील मांसपेशी रिलैक्सेशन: https://www.youtube.com/watch?v=STPuP0kUnTo
-5. गहरी सांस लेने की तकनीक: https://www.youtube.com/watch?v=kQUae5zodJ8
-6. बेडरूम का वातावरण: https://www.youtube.com/watch?v=dxsR_l5bu7w
-7. दिनचर्या और नींद: https://www.youtube.com/watch?v=KVfDhbFRfy0
-8. संज्ञानात्मक पुनर्गठन: https://www.youtube.com/watch?v=SclJBsQYI_Q
-9. नींद प्रतिबंध चिकित्सा: https://www.youtube.com/watch?v=7okjM6Tq14E
-
-तैयार किया गया: {datetime.now().strftime('%d/%m/%Y')}
-SleepMitra - Hindi Insomnia Management System"""
-        else:
-            therapy_plan = f"""नींद साथी - सामान्य चिकित्सा योजना
-
-सामान्य नींद स्वच्छता सुझाव:
-• नियमित सोने का समय निर्धारित करें
-• बेडरूम को ठंडा, अंधेरा और शांत रखें
-• सोने से 1 घंटे पहले स्क्रीन से दूर रहें
-• कैफीन और शराब से बचें
-• रिलैक्सेशन तकनीकों का उपयोग करें
-• नियमित व्यायाम करें
-
-वीडियो लिंक्स:
-1. CBT-I का परिचय: https://www.youtube.com/watch?v=GyxqKoQAxTk
-2. नींद प्रतिबंध तकनीक: https://www.youtube.com/watch?v=DdtHsaZ_Xp4
-3. नींद स्वच्छता: https://www.youtube.com/watch?v=s2dQPI9ZPO0
-4. प्रगतिशील मांसपेशी रिलैक्सेशन: https://www.youtube.com/watch?v=STPuP0kUnTo
-5. गहरी सांस लेने की तकनीक: https://www.youtube.com/watch?v=kQUae5zodJ8
-6. बेडरूम का वातावरण: https://www.youtube.com/watch?v=dxsR_l5bu7w
-7. दिनचर्या और नींद: https://www.youtube.com/watch?v=KVfDhbFRfy0
-8. संज्ञानात्मक पुनर्गठन: https://www.youtube.com/watch?v=SclJBsQYI_Q
-9. नींद प्रतिबंध चिकित्सा: https://www.youtube.com/watch?v=7okjM6Tq14E
-
-तैयार किया गया: {datetime.now().strftime('%d/%m/%Y')}
-SleepMitra - Hindi Insomnia Management System"""
+        st.session_state.plan_download_requested = True
+    
+    # The document is only rendered once a download has been requested, then served from the content-addressed cache
+    if st.session_state.get('plan_download_requested'):
+        doc_format = st.radio(
+            "फॉर्मेट चुनें",
+            list(PLAN_DOCUMENT_FORMATS.keys()),
+            format_func=lambda f: {'text': "📄 टेक्स्ट (.txt)", 'markdown': "📝 Markdown (.md)"}[f],
+            horizontal=True,
+            key="plan_download_format"
+        )
+        _, document = get_plan_document(doc_format, last_assessment, st.session_state.therapy_plan if last_assessment else None)
         
         st.download_button(
             label="📥 चिकित्सा योजना डाउनलोड करें",
-            data=therapy_plan,
-            file_name=f"sleepmitra-therapy-plan-{datetime.now().strftime('%Y-%m-%d')}.txt",
-            mime="text/plain"
+            data=document,
+            file_name=f"sleepmitra-therapy-plan-{datetime.now().strftime('%Y-%m-%d')}.{PLAN_DOCUMENT_FORMATS[doc_format]['extension']}",
+            mime=PLAN_DOCUMENT_FORMATS[doc_format]['mime']
         )
 
+def get_bot_response(message):
+    """Get bot response based on user message"""
+    return get_knowledge_base().answer(message)
+
+def render_conversation_message(speaker: str, timestamp: str, text: str, from_user: bool):
+    """One bubble of the voice-mode conversation"""
+    background, border = ("#e3f2fd", "#2196f3") if from_user else ("#e8f5e8", "#28a745")
+    text = text.replace("\n", "<br>")
+    st.markdown(f"""
+    <div style="background: {background}; padding: 1rem; border-radius: 10px; margin: 0.5rem 0; border-left: 4px solid {border};">
+        <strong>{speaker} ({timestamp}):</strong> {text}
+    </div>
+    """, unsafe_allow_html=True)
+
+# Text chat messages kept in session state (oldest dropped first)
+MAX_CHAT_MESSAGES = 50
+
 def show_chatbot():
     st.markdown("### 🤖 नींद सहायक चैटबॉट")
     st.markdown("नींद से जुड़े आपके सवालों के जवाब पाएं।")
     
     # Initialize chat history in session state
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = [
-            {"role": "bot", "content": "नमस्ते! मैं आपकी नींद से जुड़ी समस्याओं में मदद कर सकता हूं। आप क्या जानना चाहते हैं?"}
-        ]
-    
-    # Knowledge base for the chatbot
-    chatbot_knowledge = {
-        'नींद की गुणवत्ता कैसे सुधारें?': {
-            'answer': 'नींद की गुणवत्ता सुधारने के लिए ये उपाय अपनाएं:\n\n• नियमित सोने का समय निर्धारित करें\n• सोने से 1 घंटे पहले स्क्रीन से दूर रहें\n• बेडरूम को ठंडा, अंधेरा और शांत रखें\n• कैफीन और शराब से बचें\n• रिलैक्सेशन तकनीकों का उपयोग करें\n• नियमित व्यायाम करें लेकिन सोने से 3-4 घंटे पहले नहीं',
-            'suggestions': ['CBT-I क्या है?', 'अनिद्रा के लक्षण क्या हैं?', 'डॉक्टर से कब मिलना चाहिए?']
-        },
-        'CBT-I क्या है?': {
-            'answer': 'CBT-I (Cognitive Behavioral Therapy for Insomnia) नींद की समस्याओं के लिए एक प्रभावी उपचार है:\n\n• सोने के समय को नियंत्रित करना\n• बेडरूम को सिर्फ सोने के लिए उपयोग करना\n• नकारात्मक विचारों को बदलना\n• रिलैक्सेशन तकनीकें सीखना\n• नींद की स्वच्छता के नियमों का पालन करना\n\nयह दवा के बिना नींद की समस्याओं को ठीक करने का सबसे प्रभावी तरीका है।',
-            'suggestions': ['नींद की गुणवत्ता कैसे सुधारें?', 'अनिद्रा के लक्षण क्या हैं?']
-        },
-        'अनिद्रा के लक्षण क्या हैं?': {
-            'answer': 'अनिद्रा के मुख्य लक्षण हैं:\n\n• सोने में कठिनाई\n• रात में बार-बार जागना\n• जल्दी उठ जाना और फिर न सो पाना\n• दिन में थकान और नींद आना\n• एकाग्रता में कमी\n• मूड में बदलाव\n• चिंता और तनाव\n\nयदि ये लक्षण 3 सप्ताह से अधिक समय तक रहें तो डॉक्टर से सलाह लें।',
-            'suggestions': ['डॉक्टर से कब मिलना चाहिए?', 'CBT-I क्या है?']
-        },
-        'डॉक्टर से कब मिलना चाहिए?': {
-            'answer': 'नींद विशेषज्ञ से मिलने के लिए ये स्थितियां हैं:\n\n• 3 सप्ताह से अधिक समय तक नींद की समस्या\n• दिन में काम पर प्रभाव पड़ना\n• चिंता या अवसाद के लक्षण\n• नींद की गोलियों पर निर्भरता\n• सांस लेने में तकलीफ या खर्राटे\n• पैरों में बेचैनी\n\nहमारे पास डॉ. प्रिया शर्मा जैसे अनुभवी विशेषज्ञ हैं जो आपकी मदद कर सकते हैं।',
-            'suggestions': ['अपॉइंटमेंट कैसे बुक करें?', 'CBT-I क्या है?']
-        },
-        'अपॉइंटमेंट कैसे बुक करें?': {
-            'answer': 'अपॉइंटमेंट बुक करने के लिए:\n\n1. "अपॉइंटमेंट" पेज पर जाएं\n2. उपलब्ध समय स्लॉट चुनें\n3. टेलीकंसल्टेशन या क्लिनिक विजिट चुनें\n4. अपनी जानकारी भरें\n5. बुकिंग की पुष्टि करें\n\nहमारे पास सुबह 9 बजे से शाम 4 बजे तक स्लॉट उपलब्ध हैं।',
-            'suggestions': ['डॉक्टर से कब मिलना चाहिए?', 'टेलीकंसल्टेशन क्या है?']
-        },
-        'टेलीकंसल्टेशन क्या है?': {
-            'answer': 'टेलीकंसल्टेशन एक वीडियो कॉल के माध्यम से डॉक्टर से मिलने का तरीका है:\n\n• घर बैठे डॉक्टर से सलाह\n• समय और पैसे की बचत\n• सुरक्षित और सुविधाजनक\n• उतनी ही प्रभावी जितनी व्यक्तिगत मुलाकात\n• सभी जरूरी जांच और सलाह मिलती है\n\nआप अपने मोबाइल या कंप्यूटर से आसानी से जुड़ सकते हैं।',
-            'suggestions': ['अपॉइंटमेंट कैसे बुक करें?', 'डॉक्टर से कब मिलना चाहिए?']
-        }
-    }
-    
-    def get_bot_response(message):
-        """Get bot response based on user message"""
-        lower_message = message.lower()
-        
-        # Check for exact matches first
-        if message in chatbot_knowledge:
-            return chatbot_knowledge[message]
-        
-        # Check for keyword matches
-        if 'नींद' in lower_message and ('सुधार' in lower_message or 'बेहतर' in lower_message):
-            return chatbot_knowledge['नींद की गुणवत्ता कैसे सुधारें?']
-        
-        if 'cbt' in lower_message or 'थेरेपी' in lower_message:
-            return chatbot_knowledge['CBT-I क्या है?']
-        
-        if 'लक्षण' in lower_message or 'समस्या' in lower_message:
-            return chatbot_knowledge['अनिद्रा के लक्षण क्या हैं?']
-        
-        if 'डॉक्टर' in lower_message or 'विशेषज्ञ' in lower_message:
-            return chatbot_knowledge['डॉक्टर से कब मिलना चाहिए?']
-        
-        if 'अपॉइंटमेंट' in lower_message or 'बुक' in lower_message:
-            return chatbot_knowledge['अपॉइंटमेंट कैसे बुक करें?']
-        
-        if 'टेली' in lower_message or 'वीडियो' in lower_message:
-            return chatbot_knowledge['टेलीकंसल्टेशन क्या है?']
-        
-        # Default response
-        return {
-            'answer': 'मुझे खेद है, मैं आपके सवाल को पूरी तरह समझ नहीं पाया। कृपया नीचे दिए गए विकल्पों में से कोई चुनें या अपना सवाल दोबारा पूछें।',
-            'suggestions': ['नींद की गुणवत्ता कैसे सुधारें?', 'CBT-I क्या है?', 'अनिद्रा के लक्षण क्या हैं?', 'डॉक्टर से कब मिलना चाहिए?']
-        }
+        st.session_state.chat_history = deque([
+            {"role": "bot", "content": get_knowledge_base().greeting}
+        ], maxlen=MAX_CHAT_MESSAGES)
     
     # Display chat history
     chat_container = st.container()
@@ -2085,9 +2007,9 @@ def show_chatbot():
     
     # Clear chat button
     if st.button("🗑️ चैट हिस्ट्री साफ करें", use_container_width=True, key="clear_chat"):
-        st.session_state.chat_history = [
-            {"role": "bot", "content": "नमस्ते! मैं आपकी नींद से जुड़ी समस्याओं में मदद कर सकता हूं। आप क्या जानना चाहते हैं?"}
-        ]
+        st.session_state.chat_history = deque([
+            {"role": "bot", "content": get_knowledge_base().greeting}
+        ], maxlen=MAX_CHAT_MESSAGES)
         st.rerun()
     
     # Contact options section
@@ -2181,9 +2103,10 @@ def show_chatbot():
         if st.session_state.voice_mode:
             st.success("🎤 वॉइस मोड चालू है! अब आप बोल सकते हैं और AI आपसे बात करेगा")
             
-            # Initialize conversation history
-            if 'conversation_history' not in st.session_state:
-                st.session_state.conversation_history = []
+            # Initialize conversation memory (recent turns plus a rolling summary of older ones)
+            if 'conversation_memory' not in st.session_state:
+                st.session_state.conversation_memory = ConversationMemory()
+            memory = st.session_state.conversation_memory
             
             # Voice input area
             voice_input = st.text_area(
@@ -2211,44 +2134,37 @@ def show_chatbot():
             with col1:
                 if st.button("🤖 AI से पूछें", use_container_width=True, key="ask_ai_voice"):
                     if voice_input.strip():
-                        with st.spinner("🤖 AI जवाब दे रहा है..."):
-                            ai_response = get_ai_response(voice_input)
-                            
-                            # Add to conversation history
-                            st.session_state.conversation_history.append({
-                                'user': voice_input,
-                                'ai': ai_response,
-                                'timestamp': datetime.now().strftime("%H:%M")
-                            })
-                            
-                            # Display conversation
-                            st.markdown("### 💬 बातचीत")
-                            for msg in st.session_state.conversation_history[-5:]:  # Show last 5 messages
-                                st.markdown(f"""
-                                <div style="background: #e3f2fd; padding: 1rem; border-radius: 10px; margin: 0.5rem 0; border-left: 4px solid #2196f3;">
-                                    <strong>आप ({msg['timestamp']}):</strong> {msg['user']}
-                                </div>
-                                """, unsafe_allow_html=True)
-                                
-                                st.markdown(f"""
-                                <div style="background: #e8f5e8; padding: 1rem; border-radius: 10px; margin: 0.5rem 0; border-left: 4px solid #28a745;">
-                                    <strong>AI ({msg['timestamp']}):</strong> {msg['ai']}
-                                </div>
-                                """, unsafe_allow_html=True)
-                            
-                            # Voice output instructions
-                            st.info("""
-                            **🔊 AI का जवाब सुनने के लिए:**
-                            - **Mac:** ऊपर दिए गए जवाब को सेलेक्ट करें → Cmd + Option + S
-                            - **Chrome/Edge:** जवाब को सेलेक्ट करें → राइट-क्लिक → "Read aloud" चुनें
-                            - **Windows:** जवाब को सेलेक्ट करें → Ctrl + Shift + S
-                            """)
+                        timestamp = datetime.now().strftime("%H:%M")
+                        
+                        # Display conversation: previous turns, then the new answer streamed as it arrives
+                        st.markdown("### 💬 बातचीत")
+                        if memory.summary_lines:
+                            with st.expander("📜 पिछली बातचीत का सारांश"):
+                                st.text(memory.summary)
+                        for msg in memory.recent(4):  # Show last 5 messages with the new one
+                            render_conversation_message("आप", msg['timestamp'], msg['user'], from_user=True)
+                            render_conversation_message("AI", msg['timestamp'], msg['ai'], from_user=False)
+                        
+                        render_conversation_message("आप", timestamp, voice_input, from_user=True)
+                        st.markdown(f"**AI ({timestamp}):**")
+                        ai_response = st.write_stream(stream_answer(voice_input, memory.context_messages()))
+                        
+                        # Add to conversation memory
+                        memory.add_turn(voice_input, ai_response, timestamp)
+                        
+                        # Voice output instructions
+                        st.info("""
+                        **🔊 AI का जवाब सुनने के लिए:**
+                        - **Mac:** ऊपर दिए गए जवाब को सेलेक्ट करें → Cmd + Option + S
+                        - **Chrome/Edge:** जवाब को सेलेक्ट करें → राइट-क्लिक → "Read aloud" चुनें
+                        - **Windows:** जवाब को सेलेक्ट करें → Ctrl + Shift + S
+                        """)
                     else:
                         st.warning("कृपया पहले अपना सवाल लिखें या बोलें")
             
             with col2:
                 if st.button("🗑️ बातचीत साफ करें", use_container_width=True, key="clear_conversation"):
-                    st.session_state.conversation_history = []
+                    memory.clear()
                     st.success("बातचीत साफ हो गई!")
                     st.rerun()
         else:
@@ -2270,18 +2186,11 @@ def show_chatbot():
             
             if st.form_submit_button("🤖 AI से पूछें (टेक्स्ट)", use_container_width=True):
                 if voice_text.strip():
-                    with st.spinner("🤖 AI आपके सवाल का जवाब दे रहा है..."):
-                        ai_response = get_ai_response(voice_text)
-                        
-                        # Display AI response
-                        st.markdown(f"""
-                        <div style="background: #e8f5e8; padding: 1.5rem; border-radius: 10px; margin: 1rem 0; border-left: 4px solid #28a745;">
-                            <h4 style="color: #28a745; margin: 0 0 1rem 0;">🤖 AI असिस्टेंट का जवाब:</h4>
-                            <div style="font-size: 1.1rem; line-height: 1.6; color: #333;">
-                                {ai_response}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
+                    # Display AI response as it streams in
+                    st.markdown("""
+                    <h4 style="color: #28a745; margin: 1rem 0 0.5rem 0;">🤖 AI असिस्टेंट का जवाब:</h4>
+                    """, unsafe_allow_html=True)
+                    st.write_stream(stream_answer(voice_text))
                 else:
                     st.warning("कृपया अपना सवाल लिखें।")
         
@@ -2292,7 +2201,7 @@ def show_chatbot():
         with col_q1:
             if st.button("😴 नींद नहीं आ रही", use_container_width=True, key="quick_q1"):
                 with st.spinner("🤖 AI जवाब दे रहा है..."):
-                    ai_response = get_ai_response("मुझे नींद नहीं आ रही, क्या करूं?")
+                    ai_response = answer_question("मुझे नींद नहीं आ रही, क्या करूं?").replace("\n", "<br>")
                     st.markdown(f"""
                     <div style="background: #e8f5e8; padding: 1rem; border-radius: 10px; margin: 0.5rem 0; border-left: 4px solid #28a745;">
                         <h5 style="color: #28a745; margin: 0 0 0.5rem 0;">🤖 AI का जवाब:</h5>
@@ -2305,7 +2214,7 @@ def show_chatbot():
         with col_q2:
             if st.button("🧠 CBT-I क्या है?", use_container_width=True, key="quick_q2"):
                 with st.spinner("🤖 AI जवाब दे रहा है..."):
-                    ai_response = get_ai_response("CBT-I थेरेपी क्या है?")
+                    ai_response = answer_question("CBT-I थेरेपी क्या है?").replace("\n", "<br>")
                     st.markdown(f"""
                     <div style="background: #e8f5e8; padding: 1rem; border-radius: 10px; margin: 0.5rem 0; border-left: 4px solid #28a745;">
                         <h5 style="color: #28a745; margin: 0 0 0.5rem 0;">🤖 AI का जवाब:</h5>
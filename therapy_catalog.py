@@ -0,0 +1,139 @@
+"""
+Therapy module catalog for SleepMitra
+Process-wide, immutable catalog of therapy modules indexed by id, difficulty and tag.
+Sessions and therapy plans store module ids only and resolve them here.
+"""
+
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+# Therapy modules data (source records; exposed read-only below)
+_THERAPY_MODULE_RECORDS = [
+    {
+        'id': 'cbti_basics',
+        'name': 'CBT-I मूल बातें',
+        'description': 'नींद चिकित्सा की मूल बातें और CBT-I तकनीकों का परिचय',
+        'duration': '30 मिनट',
+        'difficulty': 'शुरुआती',
+        'video_url': 'https://www.youtube.com/watch?v=GyxqKoQAxTk',
+        'icon': '🧠',
+        'tags': ['cbti']
+    },
+    {
+        'id': 'sleep_restriction',
+        'name': 'नींद प्रतिबंध तकनीक',
+        'description': 'सोने के समय को नियंत्रित करने की तकनीक',
+        'duration': '25 मिनट',
+        'difficulty': 'मध्यम',
+        'video_url': 'https://www.youtube.com/watch?v=DdtHsaZ_Xp4',
+        'icon': '⏰',
+        'tags': ['cbti', 'sleep_restriction']
+    },
+    {
+        'id': 'sleep_hygiene',
+        'name': 'नींद स्वच्छता',
+        'description': 'अच्छी नींद के लिए आदतें और वातावरण',
+        'duration': '20 मिनट',
+        'difficulty': 'शुरुआती',
+        'video_url': 'https://www.youtube.com/watch?v=s2dQPI9ZPO0',
+        'icon': '🌙',
+        'tags': ['hygiene']
+    },
+    {
+        'id': 'progressive_relaxation',
+        'name': 'प्रगतिशील मांसपेशी रिलैक्सेशन',
+        'description': 'शरीर को आराम देने की तकनीक',
+        'duration': '35 मिनट',
+        'difficulty': 'मध्यम',
+        'video_url': 'https://www.youtube.com/watch?v=STPuP0kUnTo',
+        'icon': '🧘‍♀️',
+        'tags': ['relaxation']
+    },
+    {
+        'id': 'breathing_techniques',
+        'name': 'गहरी सांस लेने की तकनीक',
+        'description': 'तनाव कम करने के लिए सांस लेने के व्यायाम',
+        'duration': '15 मिनट',
+        'difficulty': 'शुरुआती',
+        'video_url': 'https://www.youtube.com/watch?v=kQUae5zodJ8',
+        'icon': '🫁',
+        'tags': ['relaxation']
+    },
+    {
+        'id': 'bedroom_environment',
+        'name': 'बेडरूम का वातावरण',
+        'description': 'नींद के लिए आदर्श वातावरण बनाना',
+        'duration': '20 मिनट',
+        'difficulty': 'शुरुआती',
+        'video_url': 'https://www.youtube.com/watch?v=dxsR_l5bu7w',
+        'icon': '🏠',
+        'tags': ['hygiene']
+    },
+    {
+        'id': 'sleep_routine',
+        'name': 'दिनचर्या और नींद',
+        'description': 'नियमित दिनचर्या का महत्व',
+        'duration': '25 मिनट',
+        'difficulty': 'शुरुआती',
+        'video_url': 'https://www.youtube.com/watch?v=KVfDhbFRfy0',
+        'icon': '📅',
+        'tags': ['hygiene']
+    },
+    {
+        'id': 'cognitive_restructuring',
+        'name': 'संज्ञानात्मक पुनर्गठन',
+        'description': 'नींद के बारे में नकारात्मक विचारों को बदलना',
+        'duration': '40 मिनट',
+        'difficulty': 'उन्नत',
+        'video_url': 'https://www.youtube.com/watch?v=SclJBsQYI_Q',
+        'icon': '💭',
+        'tags': ['cbti', 'cognitive']
+    },
+    {
+        'id': 'sleep_restriction_therapy',
+        'name': 'नींद प्रतिबंध चिकित्सा',
+        'description': 'नींद की दक्षता बढ़ाने की तकनीक',
+        'duration': '30 मिनट',
+        'difficulty': 'उन्नत',
+        'video_url': 'https://www.youtube.com/watch?v=7okjM6Tq14E',
+        'icon': '🎯',
+        'tags': ['cbti', 'sleep_restriction']
+    }
+]
+
+
+def _freeze(record: Dict) -> Mapping:
+    """Return a read-only view of a module record (list fields become tuples)"""
+    return MappingProxyType({
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in record.items()
+    })
+
+
+def _build_index(field: str) -> Mapping[str, Tuple[Mapping, ...]]:
+    """Group modules by a scalar or multi-valued field"""
+    index: Dict[str, list] = {}
+    for module in THERAPY_MODULES:
+        values = module[field] if isinstance(module[field], tuple) else (module[field],)
+        for value in values:
+            index.setdefault(value, []).append(module)
+    return MappingProxyType({key: tuple(modules) for key, modules in index.items()})
+
+
+THERAPY_MODULES: Tuple[Mapping, ...] = tuple(_freeze(record) for record in _THERAPY_MODULE_RECORDS)
+MODULES_BY_ID: Mapping[str, Mapping] = MappingProxyType({module['id']: module for module in THERAPY_MODULES})
+MODULES_BY_DIFFICULTY = _build_index('difficulty')
+MODULES_BY_TAG = _build_index('tags')
+
+del _THERAPY_MODULE_RECORDS
+
+
+def get_module(module_id: str) -> Optional[Mapping]:
+    """Look up a therapy module by id in O(1)"""
+    return MODULES_BY_ID.get(module_id)
+
+
+def get_module_label(module_id: str) -> str:
+    """Display label used in module pickers"""
+    module = MODULES_BY_ID[module_id]
+    return f"{module['icon']} {module['name']} ({module['duration']})"
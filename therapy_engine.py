@@ -0,0 +1,97 @@
+"""
+Therapy progression engine for SleepMitra
+Models the modules of a therapy plan as a DAG of prerequisites and keeps
+the unlocked/completed state up to date incrementally.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set
+
+# Prerequisites between therapy modules (module id -> ids that must be completed first).
+# Prerequisites that are not part of a given plan are ignored for that plan.
+MODULE_PREREQUISITES: Dict[str, List[str]] = {
+    'sleep_hygiene': [],
+    'bedroom_environment': ['sleep_hygiene'],
+    'sleep_routine': ['sleep_hygiene'],
+    'breathing_techniques': ['sleep_routine'],
+    'progressive_relaxation': ['breathing_techniques'],
+    'cbti_basics': ['bedroom_environment', 'sleep_routine'],
+    'sleep_restriction': ['cbti_basics'],
+    'cognitive_restructuring': ['cbti_basics'],
+    'sleep_restriction_therapy': ['sleep_restriction', 'cognitive_restructuring']
+}
+
+
+class TherapyProgress:
+    """Set-based unlock state for one therapy plan with O(1) lookups by module id"""
+
+    def __init__(self, plan_modules: List[Dict], completed_ids: Iterable[str] = ()):
+        self.plan_modules = {module['id']: module for module in plan_modules}
+        self.dependents: Dict[str, List[str]] = {module_id: [] for module_id in self.plan_modules}
+        self.remaining: Dict[str, int] = {}
+
+        previous_id = None
+        for module in plan_modules:
+            requires = self._resolve_prerequisites(module, previous_id)
+            self.remaining[module['id']] = len(requires)
+            for prerequisite_id in requires:
+                self.dependents[prerequisite_id].append(module['id'])
+            previous_id = module['id']
+
+        self._check_acyclic()
+
+        self.completed: Set[str] = set()
+        self.unlocked: Set[str] = {module_id for module_id, count in self.remaining.items() if count == 0}
+        for module_id in completed_ids:
+            self.complete(module_id)
+
+        for module_id, module in self.plan_modules.items():
+            module['unlocked'] = module_id in self.unlocked
+
+    def _resolve_prerequisites(self, module: Dict, previous_id: Optional[str]) -> List[str]:
+        """Explicit 'requires' on the plan entry wins, then the catalog map, then the previous module"""
+        requires = module.get('requires')
+        if requires is None:
+            if module['id'] in MODULE_PREREQUISITES:
+                requires = MODULE_PREREQUISITES[module['id']]
+            else:
+                requires = [previous_id] if previous_id else []
+        return [module_id for module_id in dict.fromkeys(requires) if module_id in self.plan_modules]
+
+    def _check_acyclic(self):
+        """Raise ValueError if the prerequisites contain a cycle (Kahn's algorithm)"""
+        remaining = dict(self.remaining)
+        ready = [module_id for module_id, count in remaining.items() if count == 0]
+        visited = 0
+        while ready:
+            module_id = ready.pop()
+            visited += 1
+            for dependent_id in self.dependents[module_id]:
+                remaining[dependent_id] -= 1
+                if remaining[dependent_id] == 0:
+                    ready.append(dependent_id)
+        if visited != len(remaining):
+            raise ValueError("Therapy plan prerequisites contain a cycle")
+
+    def is_completed(self, module_id: str) -> bool:
+        return module_id in self.completed
+
+    def is_unlocked(self, module_id: str) -> bool:
+        return module_id in self.unlocked
+
+    def complete(self, module_id: str) -> List[str]:
+        """Mark a module as completed and return the ids of modules it newly unlocks"""
+        if module_id not in self.plan_modules or module_id in self.completed:
+            return []
+
+        self.completed.add(module_id)
+        self.unlocked.add(module_id)
+        self.plan_modules[module_id]['unlocked'] = True
+
+        newly_unlocked = []
+        for dependent_id in self.dependents[module_id]:
+            self.remaining[dependent_id] -= 1
+            if self.remaining[dependent_id] == 0 and dependent_id not in self.unlocked:
+                self.unlocked.add(dependent_id)
+                self.plan_modules[dependent_id]['unlocked'] = True
+                newly_unlocked.append(dependent_id)
+        return newly_unlocked